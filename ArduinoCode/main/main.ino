@@ -4,6 +4,33 @@
 
 Adafruit_MCP9600 sensors[SENSOR_COUNT];
 
+/*
+   Output mode. Text (CSV lines) until the PC asks for binary frames by
+   sending "BIN1" (float32) or "BIN2" (int16 centi-degrees) after READY.
+   "TEXT" switches back.
+
+   Text line:
+     millis,seq,hot0,cold0,hot1,cold1,...
+
+   Binary frame (little-endian):
+     A5 5A | enc (1 byte) | seq (2) | millis (4) | count (1) | values | CRC-16/CCITT (2)
+
+   millis is when the readings were taken and seq counts readings (wrapping
+   at 65536), so the PC can time samples accurately and spot lost ones.
+   The CRC covers enc..values. int16 values are degrees * 100, with
+   -32768 meaning NaN / out of range.
+*/
+enum OutputMode { MODE_TEXT = 0, MODE_FLOAT32 = 1, MODE_INT16 = 2 };
+OutputMode outputMode = MODE_TEXT;
+uint16_t frameSeq = 0;
+
+const uint8_t VALUE_COUNT = 2 * SENSOR_COUNT;
+uint8_t frameBuf[12 + VALUE_COUNT * 4];
+
+uint32_t sampleMillis = 0;
+float hotValues[SENSOR_COUNT];
+float coldValues[SENSOR_COUNT];
+
 // Select TCA channel (Multiplexer)
 void tcaselect(uint8_t channel) {
   if (channel > 7) return;
@@ -12,6 +39,111 @@ void tcaselect(uint8_t channel) {
   Wire.endTransmission();
 }
 
+// CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), same as Python's binascii.crc_hqx
+uint16_t crc16(const uint8_t *data, uint16_t len) {
+  uint16_t crc = 0xFFFF;
+  for (uint16_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t b = 0; b < 8; b++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+    }
+  }
+  return crc;
+}
+
+// Handle "BIN1" / "BIN2" / "TEXT" commands from the PC
+void checkCommands() {
+  static char cmd[8];
+  static uint8_t len = 0;
+
+  while (Serial.available()) {
+    char c = Serial.read();
+
+    if (c == '\n' || c == '\r') {
+      if (len == 0) continue;
+      cmd[len] = '\0';
+      len = 0;
+
+      if (strcmp(cmd, "BIN1") == 0) {
+        Serial.println("BINARY OK");
+        outputMode = MODE_FLOAT32;
+      } else if (strcmp(cmd, "BIN2") == 0) {
+        Serial.println("BINARY OK");
+        outputMode = MODE_INT16;
+      } else if (strcmp(cmd, "TEXT") == 0) {
+        outputMode = MODE_TEXT;
+        Serial.println("TEXT OK");
+      }
+    } else if (len < sizeof(cmd) - 1) {
+      cmd[len++] = c;
+    }
+  }
+}
+
+void sendText() {
+  Serial.print(sampleMillis);
+  Serial.print(",");
+  Serial.print(frameSeq);
+  Serial.print(",");
+
+  for (uint8_t i = 0; i < SENSOR_COUNT; i++) {
+    // Print HOT value
+    Serial.print(hotValues[i]);
+    Serial.print(",");
+
+    // Print COLD value
+    Serial.print(coldValues[i]);
+
+    if (i < SENSOR_COUNT - 1) {
+      Serial.print(",");
+    }
+  }
+  Serial.println();
+  frameSeq++;
+}
+
+void putValue(uint8_t *dst, float v) {
+  if (outputMode == MODE_FLOAT32) {
+    memcpy(dst, &v, 4);  // AVR floats are IEEE-754 little-endian
+    return;
+  }
+
+  int16_t centi = -32768;
+  if (!isnan(v) && v > -327.67 && v < 327.67) {
+    centi = (int16_t)lround(v * 100.0);
+  }
+  memcpy(dst, &centi, 2);
+}
+
+void sendFrame() {
+  uint8_t width = (outputMode == MODE_FLOAT32) ? 4 : 2;
+  uint16_t n = 0;
+
+  frameBuf[n++] = 0xA5;
+  frameBuf[n++] = 0x5A;
+  frameBuf[n++] = (uint8_t)outputMode;
+  frameBuf[n++] = frameSeq & 0xFF;
+  frameBuf[n++] = frameSeq >> 8;
+  for (uint8_t b = 0; b < 4; b++) {
+    frameBuf[n++] = (sampleMillis >> (8 * b)) & 0xFF;
+  }
+  frameBuf[n++] = VALUE_COUNT;
+
+  for (uint8_t i = 0; i < SENSOR_COUNT; i++) {
+    putValue(&frameBuf[n], hotValues[i]);
+    n += width;
+    putValue(&frameBuf[n], coldValues[i]);
+    n += width;
+  }
+
+  uint16_t crc = crc16(&frameBuf[2], n - 2);
+  frameBuf[n++] = crc & 0xFF;
+  frameBuf[n++] = crc >> 8;
+
+  Serial.write(frameBuf, n);
+  frameSeq++;
+}
+
 void setup() {
   Serial.begin(BAUDRATE);
   while (!Serial);
@@ -48,26 +180,23 @@ void setup() {
 
 
 void loop() {
+  checkCommands();
+
+  sampleMillis = millis();
   for (uint8_t i = 0; i < SENSOR_COUNT; i++) {
 
     tcaselect(SENSOR_CHANNEL[i]);
     delay(CHANNEL_SWITCH_DELAY_MS);
 
-    float hot  = sensors[i].readThermocouple(); // main temperature
-    float cold = sensors[i].readAmbient();      // reference cold junction
-
-    // Print HOT value
-    Serial.print(hot);
-    Serial.print(",");
-
-    // Print COLD value
-    Serial.print(cold);
+    hotValues[i]  = sensors[i].readThermocouple(); // main temperature
+    coldValues[i] = sensors[i].readAmbient();      // reference cold junction
+  }
 
-    if (i < SENSOR_COUNT - 1) {
-      Serial.print(",");
-    }
+  if (outputMode == MODE_TEXT) {
+    sendText();
+  } else {
+    sendFrame();
   }
 
-  Serial.println();
   delay(READ_INTERVAL_MS);
 }
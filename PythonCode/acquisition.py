@@ -0,0 +1,627 @@
+import time
+import queue
+import binascii
+import threading
+from datetime import datetime
+
+import numpy as np
+import serial
+
+from config import *
+from simdevice import SimulatedArduino, is_simulated
+
+
+# ---------------- ARDUINO HELPERS ------------------
+
+def parse_csv(line):
+    try:
+        return [float(x) if x != "nan" else float("nan") for x in line.split(",")]
+    except ValueError:
+        return None
+
+
+# ---------------- BATCH LINE PARSER ------------------
+
+class CsvChunkParser:
+    """
+    Turns raw bytes from the port into rows of floats, a chunk at a time.
+
+    feed() returns (device_ms, seq, values). Current firmware starts every
+    line with millis() and a frame counter; lines from older firmware carry
+    only the values, in which case device_ms is NaN and seq is -1. Which of
+    the two layouts is in use is decided by the first data line.
+
+    Complete lines are split off the chunk (a trailing partial line is kept
+    for the next call), filtered on their comma count and converted together
+    with a single np.fromstring() call. Only when that fails is the batch
+    re-parsed line by line to find the bad ones. Lines without commas
+    (READY, boot messages) are `ignored`; lines with commas that are not a
+    valid row are counted as `malformed`.
+    """
+
+    def __init__(self, field_count):
+        self.field_count = field_count
+        self.timed = None
+        self._tail = bytearray()
+
+        self.lines = 0
+        self.rows = 0
+        self.malformed = 0
+        self.ignored = 0
+
+    def empty(self):
+        return np.empty(0), np.empty(0, dtype=np.int64), np.empty((0, self.field_count))
+
+    def feed(self, chunk):
+        self._tail += chunk
+        end = self._tail.rfind(b"\n")
+        if end < 0:
+            return self.empty()
+
+        lines = bytes(self._tail[:end]).split(b"\n")
+        del self._tail[:end + 1]
+        self.lines += len(lines)
+
+        if self.timed is None:
+            for line in lines:
+                n = line.count(b",")
+                if n in (self.field_count - 1, self.field_count + 1):
+                    self.timed = n == self.field_count + 1
+                    break
+
+        width = self.field_count + 2 if self.timed else self.field_count
+        good = []
+        for line in lines:
+            n = line.count(b",")
+            if n == width - 1:
+                good.append(line)
+            elif n:
+                self.malformed += 1
+            elif line.strip():
+                self.ignored += 1
+
+        if not good:
+            return self.empty()
+
+        try:
+            rows = np.fromstring(b",".join(good).decode("ascii", "replace"), sep=",")
+            rows = rows.reshape(len(good), width)
+        except ValueError:
+            rows = self._parse_slow(good, width)
+
+        self.rows += len(rows)
+        if not self.timed:
+            return np.full(len(rows), np.nan), np.full(len(rows), -1, dtype=np.int64), rows
+        return rows[:, 0], rows[:, 1].astype(np.int64), rows[:, 2:]
+
+    def _parse_slow(self, lines, width):
+        rows = []
+        for line in lines:
+            row = parse_csv(line.decode(errors="ignore").strip())
+            if row is None or len(row) != width:
+                self.malformed += 1
+            else:
+                rows.append(row)
+        if not rows:
+            return np.empty((0, width))
+        return np.array(rows)
+
+
+# ---------------- BINARY FRAME PROTOCOL ------------------
+
+# Optional compact mode, requested after READY by sending a command line.
+# Frame layout (little-endian):
+#   sync   A5 5A
+#   enc    uint8   1 = float32, 2 = int16 centi-degrees
+#   seq    uint16  frame counter, wraps at 65536
+#   millis uint32  Arduino millis() when the readings were taken
+#   count  uint8   number of values (2 * SENSOR_COUNT)
+#   values count x float32 / int16
+#   crc    uint16  CRC-16/CCITT-FALSE over enc..values
+# int16 values are degrees * 100; -32768 means NaN (fault or out of range).
+
+FRAME_SYNC = b"\xa5\x5a"
+FRAME_ENCODINGS = {"float32": 1, "int16": 2}
+FRAME_COMMANDS = {"float32": b"BIN1\n", "int16": b"BIN2\n"}
+FRAME_ACK = b"BINARY OK"
+INT16_NAN = -32768
+
+
+def frame_dtype(encoding, value_count):
+    value_type = "<f4" if encoding == "float32" else "<i2"
+    return np.dtype([
+        ("sync", "<u2"),
+        ("enc", "u1"),
+        ("seq", "<u2"),
+        ("millis", "<u4"),
+        ("count", "u1"),
+        ("values", value_type, (value_count,)),
+        ("crc", "<u2"),
+    ])
+
+
+def negotiate_binary(ser, encoding, timeout=BINARY_ACK_TIMEOUT_S):
+    # Ask the Arduino to switch to binary frames; older firmware never
+    # answers, in which case we carry on in text mode
+    ser.write(FRAME_COMMANDS[encoding])
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if ser.readline().strip() == FRAME_ACK:
+            print(f"Arduino switched to binary {encoding} frames")
+            return True
+    print("No reply to binary mode request, staying in text mode")
+    return False
+
+
+class BinaryFrameParser:
+    """
+    Decodes binary frames with the same feed() interface as CsvChunkParser,
+    returning (device_ms, seq, values).
+
+    Back-to-back frames are viewed in place with np.frombuffer() using a
+    packed structured dtype, so only the CRC check runs per frame. A frame
+    with a bad sync, size or CRC is counted as malformed and the parser
+    re-synchronises on the next sync word.
+    """
+
+    def __init__(self, field_count, encoding):
+        self.field_count = field_count
+        self.encoding = encoding
+        self.dtype = frame_dtype(encoding, field_count)
+        self._enc = FRAME_ENCODINGS[encoding]
+        self._sync = int.from_bytes(FRAME_SYNC, "little")
+        self._buf = bytearray()
+
+        self.lines = 0
+        self.rows = 0
+        self.malformed = 0
+        self.ignored = 0
+
+    def empty(self):
+        return np.empty(0), np.empty(0, dtype=np.int64), np.empty((0, self.field_count))
+
+    def feed(self, chunk):
+        self._buf += chunk
+        buf = self._buf
+        size = self.dtype.itemsize
+
+        out = []
+        pos = 0
+        # The frames are read straight out of the receive buffer; the view
+        # has to be gone before the buffer can be trimmed
+        with memoryview(buf) as data:
+            while True:
+                start = buf.find(FRAME_SYNC, pos)
+                if start < 0:
+                    # Keep a last byte that may be the first half of a sync word
+                    pos = max(pos, len(buf) - 1)
+                    break
+                if start > pos:
+                    self.ignored += 1
+
+                n = (len(buf) - start) // size
+                if n == 0:
+                    pos = start
+                    break
+
+                frames = np.frombuffer(data, dtype=self.dtype, count=n, offset=start)
+                ok = (frames["sync"] == self._sync) & (frames["enc"] == self._enc) & (frames["count"] == self.field_count)
+                crcs = frames["crc"]
+                good = 0
+                for k in range(n):
+                    begin = start + k * size
+                    if not ok[k] or binascii.crc_hqx(data[begin + 2:begin + size - 2], 0xFFFF) != crcs[k]:
+                        break
+                    good += 1
+
+                if good:
+                    out.append((
+                        frames["millis"][:good].astype(np.float64),
+                        frames["seq"][:good].astype(np.int64),
+                        self._decode(frames[:good]),
+                    ))
+                del frames, crcs
+                self.lines += good
+                pos = start + good * size
+
+                if good < n:
+                    # Bad frame: skip its sync word and look for the next one
+                    self.malformed += 1
+                    pos += 1
+
+        del self._buf[:pos]
+
+        if not out:
+            return self.empty()
+        device_ms, seq, values = (np.concatenate(parts) for parts in zip(*out))
+        self.rows += len(values)
+        return device_ms, seq, values
+
+    def _decode(self, frames):
+        raw = frames["values"]
+        if self.encoding == "float32":
+            return raw.astype(np.float64)
+        values = raw.astype(np.float64) / 100
+        values[raw == INT16_NAN] = np.nan
+        return values
+
+
+# ---------------- CONNECTION ------------------
+
+def open_serial(port, baud, timeout=READ_TIMEOUT_S):
+    # DTR stays low while opening so an Arduino that is already running is
+    # not reset (where the OS allows it). serial_for_url also accepts
+    # pyserial URLs such as loop://, and sim:// / replay:// select the
+    # software Arduino in simdevice.py.
+    if is_simulated(port):
+        ser = SimulatedArduino()
+        ser.port = port
+    else:
+        ser = serial.serial_for_url(port, do_not_open=True)
+    ser.baudrate = baud
+    ser.timeout = timeout
+    ser.dtr = False
+    ser.open()
+    return ser
+
+
+def reset_arduino(ser):
+    # Raising DTR pulls the Uno's reset line low through its capacitor
+    ser.dtr = False
+    time.sleep(0.1)
+    ser.dtr = True
+
+
+class SerialConnector(threading.Thread):
+    """
+    Opens the port and waits for the Arduino without blocking the GUI.
+
+    For the first `probe` seconds it just listens: a READY line or a valid
+    data line means the board is up (data means it was already streaming,
+    so there is no reset and no boot wait). Any other line means it is
+    booting, e.g. because opening the port reset it, so READY is awaited
+    until `timeout` without resetting it again. Only if the port stays
+    silent is the board reset and READY awaited until `timeout`. Binary mode is negotiated
+    afterwards if requested. `status` describes the current step; on success
+    `ser`, `protocol` and `leftover` (bytes already read that belong to the
+    data stream) are set, otherwise `error` is.
+    """
+
+    def __init__(self, port, baud, sensor_count, protocol=SERIAL_PROTOCOL,
+                 timeout=CONNECT_TIMEOUT_S, probe=LIVE_PROBE_S):
+        super().__init__(name="SerialConnector", daemon=True)
+        self.port = port
+        self.baud = baud
+        self.sensor_count = sensor_count
+        self.requested_protocol = protocol
+        self.timeout = timeout
+        self.probe = probe
+
+        self.ser = None
+        self.protocol = "text"
+        self.leftover = b""
+        self.error = None
+        self.status = "Opening port"
+        self.started = time.monotonic()
+
+        self._stop_event = threading.Event()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def stop(self):
+        self._stop_event.set()
+
+    def close(self):
+        # For a port that connected but was never handed to a SerialReader
+        if self.ser is not None and self.ser.is_open:
+            self.ser.close()
+
+    def _is_data(self, line):
+        # Values only (older firmware) or millis,seq,values
+        return line.count(b",") in (2 * self.sensor_count - 1, 2 * self.sensor_count + 1)
+
+    def _listen(self, until):
+        # Returns ("ready" | "live" | "booting" | None, bytes following the
+        # READY/data line); "booting" = only other lines (boot messages) came
+        heard = False
+        while time.monotonic() < until and not self._stop_event.is_set():
+            raw = self.ser.readline()
+            line = raw.strip()
+            if line == b"READY":
+                return "ready", b""
+            if raw.endswith(b"\n") and self._is_data(line):
+                return "live", raw
+            heard = heard or bool(line)
+        return ("booting" if heard else None), b""
+
+    def run(self):
+        try:
+            self.ser = open_serial(self.port, self.baud)
+
+            # A board left in binary mode by a previous session goes back to text
+            self.ser.write(b"TEXT\n")
+
+            self.status = "Listening for a running Arduino"
+            state, self.leftover = self._listen(self.started + self.probe)
+
+            if state == "booting" and not self._stop_event.is_set():
+                self.status = "Arduino is starting up, waiting for READY"
+                state, self.leftover = self._listen(self.started + self.timeout)
+            elif state is None and not self._stop_event.is_set():
+                self.status = "Resetting Arduino, waiting for READY"
+                reset_arduino(self.ser)
+                state, self.leftover = self._listen(self.started + self.timeout)
+
+            if self._stop_event.is_set():
+                self.ser.close()
+                return
+            if state not in ("ready", "live"):
+                raise TimeoutError(f"No READY or data from the Arduino within {self.timeout:.0f} s")
+
+            print("Arduino is ready!" if state == "ready" else "Arduino is already streaming")
+
+            if self.requested_protocol != "text":
+                self.status = "Switching to binary frames"
+                if negotiate_binary(self.ser, self.requested_protocol):
+                    self.protocol = self.requested_protocol
+                    self.leftover = b""
+
+            self.ser.timeout = READ_TIMEOUT_S
+            self.status = "Connected"
+
+        except (serial.SerialException, OSError) as e:
+            self.error = e
+            if self.ser is not None:
+                self.ser.close()
+
+
+# ---------------- DEVICE CLOCK ------------------
+
+class DeviceClock:
+    """
+    Maps the Arduino's millis() onto wall-clock time.
+
+    Fits host_time = offset + rate * device_time by least squares, with older
+    batches exponentially forgotten (`memory` rows), so the drift of the
+    Arduino's crystal against the PC clock is tracked as it changes. millis()
+    roll-over (every ~49.7 days) is unwrapped; a jump backwards means the board
+    restarted and the fit starts over. Every row of a batch shares one host
+    time, so the rate is only re-fitted once the fit spans at least two
+    batches that arrived at different times; until then the current rate (1.0
+    at first) is kept and the newest reading is placed at its arrival time.
+    Mapped times never go backwards.
+    """
+
+    WRAP = 2 ** 32
+
+    def __init__(self, memory=CLOCK_FIT_MEMORY):
+        self.decay = 1 - 1 / memory
+        self.rate = 1.0
+        self._wraps = 0
+        self._last_raw = None
+        self._last_dev = None
+        self._last_mapped = -np.inf
+        self._reset()
+
+    def _reset(self):
+        self._x0 = self._y0 = None
+        self._sums = np.zeros(5)  # weight, x, y, xx, xy
+        self._spans_hosts = False  # Sums include more than one host time
+
+    def _unwrap(self, raw):
+        prev = raw[0] if self._last_raw is None else self._last_raw
+        steps = np.diff(raw, prepend=prev)
+        wraps = self._wraps + np.cumsum(steps < -self.WRAP / 2)
+        self._wraps = int(wraps[-1])
+        self._last_raw = raw[-1]
+        return (raw + wraps * float(self.WRAP)) / 1000.0
+
+    def map(self, device_ms, host_time):
+        mapped = np.full(len(device_ms), host_time)
+        timed = ~np.isnan(device_ms)
+
+        if timed.any():
+            dev = self._unwrap(device_ms[timed])
+            if self._last_dev is not None and dev[0] < self._last_dev - 1.0:
+                self._reset()
+            self._last_dev = dev[-1]
+
+            if self._x0 is None:
+                self._x0, self._y0 = dev[0], host_time
+            elif host_time != self._y0:
+                self._spans_hosts = True
+
+            x = dev - self._x0
+            y = host_time - self._y0
+            batch = np.array([len(x), x.sum(), y * len(x), (x * x).sum(), (x * y).sum()])
+            self._sums = self._sums * self.decay ** len(x) + batch
+
+            w, sx, sy, sxx, sxy = self._sums
+            denom = w * sxx - sx * sx
+            if self._spans_hosts and denom > 1e-6 * w * w:
+                self.rate = (w * sxy - sx * sy) / denom
+            if self._spans_hosts:
+                offset = (sy - self.rate * sx) / w
+            else:
+                # One arrival so far: the newest reading was taken by then
+                offset = -self.rate * x[-1]
+            mapped[timed] = self._y0 + offset + self.rate * x
+
+        mapped = np.maximum.accumulate(np.maximum(mapped, self._last_mapped))
+        self._last_mapped = mapped[-1]
+        return mapped
+
+
+# ---------------- BACKGROUND READER ------------------
+
+class DropOldestQueue(queue.Queue):
+    """
+    Bounded queue whose offer() never blocks: when it is full the oldest item
+    is thrown away to make room, and counted in `dropped`. Used wherever a
+    producer must never wait for a slow consumer.
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.dropped = 0
+
+    def offer(self, item):
+        while True:
+            try:
+                self.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def take_all(self):
+        # Everything queued so far, oldest first, without waiting
+        items = []
+        while True:
+            try:
+                items.append(self.get_nowait())
+            except queue.Empty:
+                return items
+
+
+def join_batches(batches, empty):
+    # Concatenates (stamps, values, arrived) batches field by field; `empty`
+    # when there are none
+    if not batches:
+        return empty
+    return tuple(np.concatenate(field) for field in zip(*batches))
+
+
+class SerialReader(threading.Thread):
+    """
+    Owns the serial port and reads it on its own thread.
+
+    Each chunk read from the port is parsed in one go, timestamped (from the
+    Arduino's own clock when the firmware sends it, otherwise with the time the
+    chunk arrived) and handed to the GUI through a bounded queue. drain()
+    returns (timestamps, values, arrived) arrays; `arrived` is when the bytes
+    of each row were read from the port, for measuring latency. Gaps in the frame counter are counted and
+    printed. If the GUI falls far enough behind
+    to fill the queue, the oldest batch is discarded so the port itself never
+    stops being drained.
+    """
+
+    def __init__(self, ser, sensor_count, protocol="text", leftover=b"",
+                 max_batches=READ_QUEUE_BATCHES, block_size=SERIAL_READ_BLOCK):
+        super().__init__(name="SerialReader", daemon=True)
+        self.ser = ser
+        self.sensor_count = sensor_count
+        self.protocol = protocol
+        self.leftover = leftover
+        if protocol == "text":
+            self.parser = CsvChunkParser(2 * sensor_count)
+        else:
+            self.parser = BinaryFrameParser(2 * sensor_count, protocol)
+
+        # One buffer reused for every read; the parser copies out what it keeps
+        self._read_buf = bytearray(block_size)
+        self._read_view = memoryview(self._read_buf)
+
+        self.clock = DeviceClock()
+        self.last_seq = None
+        self.missed_frames = 0
+
+        # Counters (see rates())
+        self.bytes_read = 0
+        self.read_calls = 0
+        self._rate_time = time.monotonic()
+        self._rate_counts = (0, 0, 0)
+
+        self.batches = DropOldestQueue(max_batches)
+        self.error = None
+
+        self._stop_event = threading.Event()
+
+        # Timestamps advance with the monotonic clock so they never go backwards
+        # (the plot window is found by binary search over them)
+        self._wall0 = time.time()
+        self._mono0 = time.monotonic()
+
+    def now(self):
+        return self._wall0 + (time.monotonic() - self._mono0)
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def malformed(self):
+        return self.parser.malformed
+
+    @property
+    def dropped_batches(self):
+        return self.batches.dropped
+
+    def rates(self):
+        # Bytes, lines and read() calls per second since the previous call
+        now = time.monotonic()
+        counts = (self.bytes_read, self.parser.lines, self.read_calls)
+        elapsed = now - self._rate_time
+        if elapsed <= 0:
+            return {"bytes_per_s": 0.0, "lines_per_s": 0.0, "reads_per_s": 0.0}
+
+        per_s = [(c - p) / elapsed for c, p in zip(counts, self._rate_counts)]
+        self._rate_time, self._rate_counts = now, counts
+        return {"bytes_per_s": per_s[0], "lines_per_s": per_s[1], "reads_per_s": per_s[2]}
+
+    def run(self):
+        try:
+            if self.leftover:
+                self._handle(self.leftover, self.now())
+
+            while not self._stop_event.is_set():
+                # One in_waiting check and one read per chunk, however many
+                # lines it holds. With nothing waiting this blocks (up to the
+                # port timeout) for the first byte.
+                waiting = self.ser.in_waiting
+                size = min(max(waiting, 1), len(self._read_buf))
+                n = self.ser.readinto(self._read_view[:size])
+                self.read_calls += 1
+                if not n:
+                    continue
+
+                self.bytes_read += n
+                self._handle(self._read_view[:n], self.now())
+
+        except serial.SerialException as e:
+            self.error = e
+
+        finally:
+            try:
+                self.ser.close()
+            except Exception:
+                pass
+
+    def _handle(self, chunk, stamp):
+        device_ms, seq, values = self.parser.feed(chunk)
+        if len(values):
+            stamps = self.clock.map(device_ms, stamp)
+            self._check_gaps(seq, stamps)
+            self.batches.offer((stamps, values, np.full(len(stamps), stamp)))
+
+    def _check_gaps(self, seq, stamps):
+        if seq[0] < 0:
+            return
+        prev = seq[0] - 1 if self.last_seq is None else self.last_seq
+        steps = np.diff(seq, prepend=prev) % 65536
+        self.last_seq = int(seq[-1])
+
+        for k in np.flatnonzero(steps != 1):
+            step = int(steps[k])
+            when = datetime.fromtimestamp(stamps[k]).strftime("%Y-%m-%d %H:%M:%S")
+            if step == 0 or step > 32768:
+                print(f"{when}: frame counter went back to {seq[k]} (Arduino restarted?)")
+                continue
+            self.missed_frames += step - 1
+            print(f"{when}: {step - 1} frame(s) missing before frame {seq[k]}")
+
+    def drain(self):
+        return join_batches(self.batches.take_all(), (np.empty(0), self.parser.empty()[2], np.empty(0)))
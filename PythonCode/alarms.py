@@ -0,0 +1,232 @@
+'''
+Limit alarms, checked on every batch of readings.
+
+ALARM_RULES in config.py lists the checks. Each rule applies to the channels
+whose name matches its "channel" pattern ("TC1_Hot", "TC*_Cold", "*_Hot"):
+
+    high / low          alarm above / below this temperature (°C)
+    hysteresis          clear only once back inside the limit by this much
+    rise_per_min        alarm when the temperature climbs faster than this,
+                        measured over ALARM_RATE_WINDOW_S
+    fault               alarm after ALARM_FAULT_SAMPLES nan readings in a row
+                        (open or disconnected thermocouple)
+
+AlarmEngine.evaluate() checks a whole (timestamps, values) batch with array
+operations: every limit is a set/reset latch whose state after each reading
+is found with a running maximum over the batch, so the cost does not depend
+on how many readings are inside or outside a limit. It returns the alarms
+raised and cleared in the batch, each with its latency: the time from the
+moment the reading's bytes were read from the serial port (`arrived`, from
+SerialReader.drain()) to the alarm being raised. With several boards
+(DEVICES) this includes the wait for the merged row.
+'''
+import csv
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+from fnmatch import fnmatchcase
+
+import numpy as np
+
+from config import *
+
+
+KINDS = ("high", "low", "rise", "fault")
+RULE_KEYS = {"channel", "high", "low", "hysteresis", "rise_per_min", "fault"}
+
+AlarmEvent = namedtuple("AlarmEvent", ["time", "channel", "kind", "active", "value", "limit", "latency"])
+
+
+def _latch(prev, set_, reset):
+    # State after every row of a set/reset latch, one column per channel;
+    # rows with neither keep the previous state
+    rows = np.arange(len(set_))[:, None]
+    last_set = np.maximum.accumulate(np.where(set_, rows, -1), axis=0)
+    last_reset = np.maximum.accumulate(np.where(reset, rows, -1), axis=0)
+    return np.where((last_set < 0) & (last_reset < 0), prev, last_set > last_reset)
+
+
+class AlarmEngine:
+    """
+    Keeps the alarm state of every channel between batches and reports the
+    changes. `active` is a (len(KINDS), channels) bool array of the alarms
+    currently raised.
+    """
+
+    def __init__(self, channels, rules=ALARM_RULES, fault_samples=ALARM_FAULT_SAMPLES,
+                 rate_window=ALARM_RATE_WINDOW_S, latency_budget_ms=ALARM_LATENCY_BUDGET_MS):
+        self.channels = list(channels)
+        n = len(self.channels)
+        self.fault_samples = fault_samples
+        self.rate_window = rate_window
+        self.latency_budget = latency_budget_ms / 1000
+
+        self.high = np.full(n, np.nan)
+        self.low = np.full(n, np.nan)
+        self.hysteresis = np.zeros(n)
+        self.rise = np.full(n, np.nan)   # °C per second
+        self.fault = np.zeros(n, dtype=bool)
+        for rule in rules:
+            self._add_rule(rule)
+
+        self.active = np.zeros((len(KINDS), n), dtype=bool)
+        self._nan_run = np.zeros(n, dtype=int)
+        self._recent = (np.empty(0), np.empty((0, n)))   # readings inside the rate window
+
+        # Latency of raised alarms (seconds) and batch evaluation time
+        self.latencies = deque(maxlen=1000)
+        self.over_budget = 0
+        self.last_eval_ms = 0.0
+
+    def _add_rule(self, rule):
+        unknown = set(rule) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"ALARM_RULES: unknown setting(s) {sorted(unknown)} in {rule}")
+        match = [i for i, name in enumerate(self.channels) if fnmatchcase(name, rule.get("channel", "*"))]
+        if not match:
+            raise ValueError(f"ALARM_RULES: no channel matches {rule.get('channel')!r}")
+
+        if "high" in rule:
+            self.high[match] = rule["high"]
+        if "low" in rule:
+            self.low[match] = rule["low"]
+        if "hysteresis" in rule:
+            self.hysteresis[match] = rule["hysteresis"]
+        if "rise_per_min" in rule:
+            self.rise[match] = rule["rise_per_min"] / 60
+        if "fault" in rule:
+            self.fault[match] = bool(rule["fault"])
+
+    # ---------- Evaluation ----------
+
+    def evaluate(self, stamps, values, arrived=None, now=None):
+        # Returns the AlarmEvents of this batch, in time order. `arrived`
+        # (when each row came off the port) defaults to the timestamps.
+        if not len(stamps):
+            return []
+        start = time.perf_counter()
+
+        states = np.empty((len(KINDS),) + values.shape, dtype=bool)
+        with np.errstate(invalid="ignore"):
+            states[0] = _latch(self.active[0], values > self.high, values < self.high - self.hysteresis)
+            states[1] = _latch(self.active[1], values < self.low, values > self.low + self.hysteresis)
+            rate = self._rates(stamps, values)
+            states[2] = _latch(self.active[2], rate > self.rise, rate < self.rise * (1 - ALARM_RATE_HYSTERESIS))
+        states[3] = self._faults(values)
+
+        arrived = stamps if arrived is None else arrived
+        events = self._events(states, stamps, values, rate, arrived, time.time() if now is None else now)
+        self.active = states[:, -1]
+        self.last_eval_ms = (time.perf_counter() - start) * 1000
+        return events
+
+    def _rates(self, stamps, values):
+        # °C per second over the last rate_window seconds, nan until that much
+        # history exists
+        if np.isnan(self.rise).all():
+            return np.full(values.shape, np.nan)
+
+        times = np.concatenate((self._recent[0], stamps))
+        history = np.concatenate((self._recent[1], values))
+        new = np.arange(len(times) - len(stamps), len(times))
+        then = np.searchsorted(times, times[new] - self.rate_window, side="left")
+        dt = times[new] - times[then]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = (history[new] - history[then]) / dt[:, None]
+        rate[dt < self.rate_window / 2] = np.nan
+
+        keep = np.searchsorted(times, times[-1] - self.rate_window, side="left")
+        self._recent = (times[keep:], history[keep:])
+        return rate
+
+    def _faults(self, values):
+        finite = ~np.isnan(values)
+        rows = np.arange(len(values))[:, None]
+        last_finite = np.maximum.accumulate(np.where(finite, rows, -1), axis=0)
+        run = np.where(last_finite >= 0, rows - last_finite, rows + 1 + self._nan_run)
+        self._nan_run = run[-1]
+        return _latch(self.active[3], (run >= self.fault_samples) & self.fault, finite)
+
+    def _events(self, states, stamps, values, rate, arrived, now):
+        before = np.concatenate((self.active[:, None, :], states[:, :-1]), axis=1)
+        kinds, rows, cols = np.nonzero(states != before)
+        if not len(rows):
+            return []
+
+        limits = np.stack((self.high, self.low, self.rise * 60, np.full(len(self.channels), np.nan)))
+        events = []
+        for k, i, c in zip(kinds.tolist(), rows.tolist(), cols.tolist()):
+            active = bool(states[k, i, c])
+            value = rate[i, c] * 60 if KINDS[k] == "rise" else values[i, c]
+            latency = now - arrived[i] if active else None
+            if active:
+                self.latencies.append(latency)
+                if latency > self.latency_budget:
+                    self.over_budget += 1
+            events.append(AlarmEvent(stamps[i], self.channels[c], KINDS[k], active,
+                                     float(value), float(limits[k, c]), latency))
+        events.sort(key=lambda e: e.time)
+        return events
+
+    # ---------- Reporting ----------
+
+    def active_alarms(self):
+        # [(channel, kind), ...] currently raised
+        kinds, cols = np.nonzero(self.active)
+        return [(self.channels[c], KINDS[k]) for k, c in zip(kinds.tolist(), cols.tolist())]
+
+    def latency_stats(self):
+        # Milliseconds from serial arrival to raised alarm, over the recent alarms
+        if not self.latencies:
+            return None
+        p50, p99 = (np.percentile(self.latencies, (50, 99)) * 1000).tolist()
+        return {"p50_ms": p50, "p99_ms": p99, "max_ms": float(max(self.latencies)) * 1000,
+                "count": len(self.latencies), "over_budget": self.over_budget}
+
+
+def describe(event):
+    if event.kind == "fault":
+        what = "sensor fault (no reading)" if event.active else "sensor reading again"
+    elif event.kind == "rise":
+        what = f"rising {event.value:.1f} °C/min (limit {event.limit:g})"
+    else:
+        what = f"{event.value:.2f} °C ({event.kind} limit {event.limit:g})"
+    return f"{event.channel} {'ALARM' if event.active else 'clear'}: {what}"
+
+
+# ---------------- ALARM LOG ------------------
+
+class AlarmLog:
+    """
+    CSV of alarm events, next to the data log. Alarms are rare, so every
+    event is written and flushed straight away.
+    """
+
+    COLUMNS = ["datetime", "time_since_start", "channel", "alarm", "state", "value", "limit", "latency_ms"]
+
+    def __init__(self, path, start_time):
+        self.path = path
+        self.start_time = start_time
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.COLUMNS)
+        self.file.flush()
+
+    def write(self, events):
+        if not events:
+            return
+        for e in events:
+            self.writer.writerow([
+                datetime.fromtimestamp(e.time).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                f"{e.time - self.start_time:.3f}",
+                e.channel,
+                e.kind,
+                "ALARM" if e.active else "clear",
+                f"{e.value:.2f}",
+                "" if np.isnan(e.limit) else f"{e.limit:g}",
+                "" if e.latency is None else f"{e.latency * 1000:.1f}",
+            ])
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
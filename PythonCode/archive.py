@@ -0,0 +1,232 @@
+'''
+Whole-session history on disk, so the plot can go back to the start of a run.
+
+The ring buffer behind the plot only holds the newest HISTORY_CAPACITY
+samples. Everything is also appended to an archive folder next to the log:
+
+    archive/raw.npy         every sample: [time_since_start, hot0, cold0, ...]
+    archive/tier_1s.npy     per-bucket [bucket start, mins..., maxs...]
+    archive/tier_10s.npy
+    archive/tier_60s.npy
+
+All of them are appendable .npy files (see BufferedNpyWriter) that are read
+back through memory maps, so showing a multi-day run touches a few thousand
+tier rows instead of loading millions of samples. Each tier is built from the
+finished buckets of the one below it, so the widths in ARCHIVE_TIERS_S must
+each divide the next.
+'''
+import os
+
+import numpy as np
+
+from config import *
+from decimate import envelope_buckets, envelope_points
+from logsink import NPY_HEADER_BYTES, BufferedNpyWriter, log_columns
+
+
+RAW_FILE = "raw.npy"
+
+
+def tier_file(width):
+    return f"tier_{width:g}s.npy"
+
+
+def archive_channels(sensor_names):
+    # Every channel the Arduino sends, in its [hot0, cold0, hot1, cold1, ...] order
+    return log_columns(sensor_names, cold_junction=True)[2:]
+
+
+# ---------------- WRITING ------------------
+
+class TierAggregator:
+    """
+    Folds rows of [time, lows..., highs...] into fixed-width buckets.
+
+    add() returns the buckets that are finished, i.e. that a later row has
+    moved past; the newest bucket stays open in memory as a running min/max
+    until then, or until finish() hands it out at the end of the session.
+    """
+
+    def __init__(self, width, channels):
+        self.width = width
+        self.channels = channels
+        self._open = None   # [bucket id, mins..., maxs...] still being filled
+
+    def add(self, rows):
+        if not len(rows):
+            return rows
+        c = self.channels
+        ids, _, mins, maxs = envelope_buckets(rows[:, 0], rows[:, 1:1 + c], rows[:, 1 + c:], self.width)
+        buckets = np.column_stack((ids, mins, maxs))
+
+        if self._open is not None:
+            if self._open[0] == buckets[0, 0]:
+                buckets[0, 1:1 + c] = np.fmin(buckets[0, 1:1 + c], self._open[1:1 + c])
+                buckets[0, 1 + c:] = np.fmax(buckets[0, 1 + c:], self._open[1 + c:])
+            else:
+                buckets = np.vstack((self._open, buckets))
+
+        self._open = buckets[-1].copy()
+        return self._rows(buckets[:-1])
+
+    def finish(self):
+        if self._open is None:
+            return np.empty((0, 1 + 2 * self.channels))
+        buckets, self._open = self._open[None, :], None
+        return self._rows(buckets)
+
+    def _rows(self, buckets):
+        # Bucket id -> bucket start time
+        buckets = buckets.copy()
+        buckets[:, 0] *= self.width
+        return buckets
+
+
+class SessionArchive:
+    """
+    Log sink that writes the archive folder. It takes the same rows the plot
+    buffer gets, [time_since_start, channel values...], and has the
+    writerows() / poll() / close() interface of the log sinks, so it runs on
+    an AsyncLogWriter thread.
+    """
+
+    def __init__(self, folder, sensor_names, tiers=ARCHIVE_TIERS_S):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+
+        channels = archive_channels(sensor_names)
+        self.channels = len(channels)
+        self.raw = BufferedNpyWriter(os.path.join(folder, RAW_FILE), ["time_since_start"] + channels)
+
+        tier_columns = (["time_since_start"] + [f"{name}_min" for name in channels]
+                        + [f"{name}_max" for name in channels])
+        self.tiers = [
+            (TierAggregator(width, self.channels), BufferedNpyWriter(os.path.join(folder, tier_file(width)), tier_columns))
+            for width in sorted(tiers)
+        ]
+
+    @property
+    def pending_rows(self):
+        return self.raw.pending_rows
+
+    def writerows(self, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        self.raw.writerows(rows)
+
+        # A raw sample is a bucket whose min and max are the reading itself
+        finished = np.column_stack((rows[:, 0], rows[:, 1:], rows[:, 1:]))
+        for aggregator, writer in self.tiers:
+            finished = aggregator.add(finished)
+            if len(finished):
+                writer.writerows(finished)
+
+    def poll(self):
+        self.raw.poll()
+        for _, writer in self.tiers:
+            writer.poll()
+
+    def close(self):
+        # The open bucket of every tier is written as it stands
+        finished = np.empty((0, 1 + 2 * self.channels))
+        for aggregator, writer in self.tiers:
+            finished = aggregator.add(finished)
+            finished = np.vstack((finished, aggregator.finish()))
+            if len(finished):
+                writer.writerows(finished)
+            writer.close()
+        self.raw.close()
+
+
+# ---------------- READING ------------------
+
+class MappedRows:
+    # Read side of a .npy file that another thread is still appending to.
+    # The row count comes from the file size, so the header is never parsed
+    # while it may be rewritten, and the map is only renewed when it grew.
+
+    def __init__(self, path, width):
+        self.path = path
+        self.width = width
+        self._map = np.empty((0, width))
+
+    def rows(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return self._map
+        n = max(size - NPY_HEADER_BYTES, 0) // (8 * self.width)
+        if n != len(self._map):
+            self._map = np.memmap(self.path, dtype=np.float64, mode="r", offset=NPY_HEADER_BYTES, shape=(n, self.width))
+        return self._map
+
+
+class ArchiveReader:
+    """
+    Min/max envelopes of any time range of an archive folder.
+
+    envelope() uses the finest level (raw samples, then each tier) that has
+    at most `max_rows` rows in the range, so the cost is bounded however long
+    the run is. Whatever a coarse tier has not written yet (its open bucket)
+    is filled in from the finer levels.
+    """
+
+    def __init__(self, folder, sensor_names, tiers=ARCHIVE_TIERS_S, max_rows=ARCHIVE_MAX_ROWS):
+        channels = len(archive_channels(sensor_names))
+        self.channels = channels
+        self.max_rows = max_rows
+        # (bucket width, rows); raw samples count as zero-width buckets
+        self.levels = [(0.0, MappedRows(os.path.join(folder, RAW_FILE), 1 + channels))]
+        self.levels += [
+            (float(width), MappedRows(os.path.join(folder, tier_file(width)), 1 + 2 * channels))
+            for width in sorted(tiers)
+        ]
+
+    def envelope(self, t0, t1, seconds_per_pixel):
+        # (x, y) envelope points, one or two buckets per pixel, for [t0, t1)
+        pieces = self._collect(t0, t1, len(self.levels) - 1)
+        if not pieces:
+            return np.empty(0), np.empty((0, self.channels))
+
+        times = np.concatenate([p[0] for p in pieces])
+        lows = np.concatenate([p[1] for p in pieces])
+        highs = np.concatenate([p[2] for p in pieces])
+        width = max(seconds_per_pixel, 1e-9)
+        ids, _, mins, maxs = envelope_buckets(times, lows, highs, width)
+        return envelope_points(ids, mins, maxs, width)
+
+    def _collect(self, t0, t1, coarsest):
+        # (times, lows, highs) blocks covering [t0, t1) from levels 0..coarsest
+        if t1 <= t0:
+            return []
+
+        level = coarsest
+        for k in range(coarsest + 1):
+            width, mapped = self.levels[k]
+            rows = mapped.rows()
+            i0, i1 = np.searchsorted(rows[:, 0], (t0 - width, t1))
+            if i1 - i0 <= self.max_rows:
+                level = k
+                break
+
+        width, mapped = self.levels[level]
+        rows = mapped.rows()
+        i0, i1 = np.searchsorted(rows[:, 0], (t0 - width, t1))
+        block = np.asarray(rows[i0:i1])
+
+        pieces = []
+        covered = t0
+        if len(block):
+            c = self.channels
+            if width:
+                pieces.append((block[:, 0], block[:, 1:1 + c], block[:, 1 + c:]))
+                covered = block[-1, 0] + width
+            else:
+                pieces.append((block[:, 0], block[:, 1:], block[:, 1:]))
+                covered = np.nextafter(block[-1, 0], np.inf)
+        elif len(rows) and rows[-1, 0] >= t1:
+            # Nothing recorded in this range (a gap in the data)
+            return pieces
+
+        if covered < t1 and level > 0:
+            pieces += self._collect(max(covered, t0), t1, level - 1)
+        return pieces
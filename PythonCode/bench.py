@@ -0,0 +1,695 @@
+'''
+Offline benchmarks for the logger's hot paths.
+
+Run from the PythonCode folder (no Arduino needed):
+
+    python bench.py                             # micro benchmarks
+    python bench.py --pipeline                  # whole GUI pipeline from sim://
+    python bench.py --pipeline --json new.json --compare old.json
+    python bench.py --selfcheck                 # correctness checks only
+
+Plots are created on Qt's offscreen platform, so no window appears.
+--json saves every number so two versions can be compared with --compare.
+--selfcheck feeds corrupted sim:// streams through both parsers, fills a slow
+log in "spill" mode and reads the shared buffer from a second process while it
+is written; it exits with status 1 if any check fails.
+'''
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from collections import deque
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt5 import QtWidgets, QtCore
+import pyqtgraph as pg
+
+from config import *
+from ringbuffer import RingBuffer
+from logsink import LOG_EXTENSIONS, AsyncLogWriter, open_log_sink
+from acquisition import BinaryFrameParser, CsvChunkParser, open_serial, parse_csv
+from sharedbuffer import SharedRingBuffer, SharedRingReader
+import gui
+
+
+# ---------------- HELPERS ------------------
+
+def cpu_ms_per_call(fn, calls):
+    start = time.process_time()
+    for _ in range(calls):
+        fn()
+    return (time.process_time() - start) * 1000 / calls
+
+
+def make_plot(curve_count):
+    p = pg.PlotWidget()
+    curves = [p.plot([], [], pen=pg.mkPen(width=2)) for _ in range(curve_count)]
+    return p, curves
+
+
+# ---------------- RENDER: BEFORE / AFTER ------------------
+
+def bench_render(sensor_count, samples, ticks, hidden_fraction, unit):
+    width = 1 + 2 * sensor_count
+    scale, offset = (9/5, 32.0) if unit == "F" else (1.0, 0.0)
+    rng = np.random.default_rng(0)
+    history = rng.uniform(20, 300, size=(samples, width))
+    history[:, 0] = np.arange(samples) * 0.01
+
+    def convert_temp(c):
+        return c * 9/5 + 32 if unit == "F" else c
+
+    hidden = int((width - 1) * hidden_fraction)
+
+    # Before: deques of boxed floats, full list rebuild of every curve per tick
+    plot_a, curves_a = make_plot(width - 1)
+    for c in curves_a[:hidden]:
+        c.setVisible(False)
+    time_data = deque(history[:, 0].tolist(), maxlen=samples)
+    cols = [deque(history[:, k].tolist(), maxlen=samples) for k in range(1, width)]
+
+    def legacy_tick():
+        t = list(time_data)
+        for k, curve in enumerate(curves_a):
+            y = [convert_temp(v) for v in cols[k]]
+            if len(y) == len(t):
+                curve.setData(t, y)
+        plot_a.setXRange(0, 10)
+
+    # After: ring buffer, one multiply-add, skip hidden/unchanged curves
+    plot_b, curves_b = make_plot(width - 1)
+    for c in curves_b[:hidden]:
+        c.setVisible(False)
+    data = RingBuffer(samples, width)
+    data.extend(history)
+    plotted = {}
+    applied = [None]
+
+    def vectorized_tick():
+        state = (data.appended, len(data), unit)
+        stale = [k for k, c in enumerate(curves_b) if c.isVisible() and plotted.get(k) != state]
+        if stale:
+            values = data.view()[:, 1:]
+            if scale != 1.0 or offset != 0.0:
+                values = values * scale + offset
+            t = data.column(0)
+            for k in stale:
+                curves_b[k].setData(t, values[:, k])
+                plotted[k] = state
+        if applied[0] != (0, 10):
+            plot_b.setXRange(0, 10)
+            applied[0] = (0, 10)
+
+    def vectorized_new_row_tick():
+        data.append(history[-1])
+        vectorized_tick()
+
+    return {
+        "before_ms": cpu_ms_per_call(legacy_tick, ticks),
+        "after_new_data_ms": cpu_ms_per_call(vectorized_new_row_tick, ticks),
+        "after_idle_ms": cpu_ms_per_call(vectorized_tick, ticks),
+    }
+
+
+# ---------------- LINE PARSING ------------------
+
+def make_stream(sensor_count, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(20, 300, size=(rows, 2 * sensor_count))
+    lines = [",".join(f"{v:.2f}" for v in row) for row in values]
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def bench_parse(sensor_count, rows=20000, chunk=4096):
+    stream = make_stream(sensor_count, rows)
+    fields = 2 * sensor_count
+
+    # Before: what poll_serial did for every readline()
+    def legacy():
+        for raw in stream.splitlines(keepends=True):
+            line = raw.decode(errors="ignore").strip()
+            if not line or "," not in line:
+                continue
+            values = parse_csv(line)
+            if values is None or len(values) != fields:
+                continue
+
+    def batched():
+        parser = CsvChunkParser(fields)
+        for k in range(0, len(stream), chunk):
+            parser.feed(stream[k:k + chunk])
+
+    def us_per_row(fn):
+        start = time.perf_counter()
+        fn()
+        return (time.perf_counter() - start) * 1e6 / rows
+
+    return {"before_us": us_per_row(legacy), "after_us": us_per_row(batched)}
+
+
+# ---------------- LOG WRITE THROUGHPUT ------------------
+
+def bench_log(log_format, sensor_count, cold_junction, rows=50000, batch=100):
+    channels = 2 * sensor_count if cold_junction else sensor_count
+    rng = np.random.default_rng(0)
+    data = np.round(rng.uniform(20, 300, size=(rows, 2 + channels)), 2)
+    data[:, 0] = np.round(np.arange(rows) * 0.01, 3)
+    data[:, 1] = time.time() + data[:, 0]
+    columns = ["time_since_start", "datetime"] + [f"ch{k}" for k in range(channels)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        sink = open_log_sink(os.path.join(folder, "bench" + LOG_EXTENSIONS[log_format]), columns, log_format)
+        start = time.perf_counter()
+        for k in range(0, rows, batch):
+            sink.writerows(data[k:k + batch])
+        sink.close()
+        return rows / (time.perf_counter() - start)
+
+
+# ---------------- WHOLE PIPELINE ------------------
+
+# A rate counts as sustained when nearly every sample arrives, nothing is
+# dropped on the way and the newest sample is on screen within LAG_LIMIT_S
+LAG_LIMIT_S = 0.5
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+    return {"p50": p50, "p95": p95, "p99": p99, "max": max(samples), "count": len(samples)}
+
+
+def use_sensor_count(sensor_count):
+    # gui.py takes these from config.py; widen them for other channel counts
+    gui.SENSOR_COUNT = sensor_count
+    gui.SENSOR_NAMES = [f"TC{i + 1}" for i in range(sensor_count)]
+    gui.VIEW_MODE_DEFAULT = "merged"
+
+
+def shut_down(win):
+    # closeEvent without the "log saved" dialog
+    win.timer.stop()
+    win.redraw.stop()
+    win.connector.stop()
+    if win.reader is not None:
+        win.reader.stop()
+        win.reader.join(timeout=2)
+        win.log.close()
+        if win.archive_log is not None:
+            win.archive_log.close()
+    win.connector.close()
+    win.hide()
+    win.deleteLater()
+
+
+def timed(fn, samples):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+        return result
+    return wrapper
+
+
+def run_events(app, seconds):
+    loop = QtCore.QEventLoop()
+    QtCore.QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+
+
+def bench_pipeline(app, rate, sensor_count, seconds):
+    # Drives the real SerialPlotter from a sim:// port at `rate` samples/s and
+    # times each stage of poll_serial while the Qt event loop runs normally
+    use_sensor_count(sensor_count)
+    with tempfile.TemporaryDirectory() as folder:
+        gui.ROOT_LOG_DIR = folder
+        win = gui.SerialPlotter(f"sim://?rate={rate}&sensors={sensor_count}&seed=0", BAUD)
+        win.resize(1500, 900)
+        win.show()
+
+        deadline = time.monotonic() + CONNECT_TIMEOUT_S
+        while win.reader is None and time.monotonic() < deadline:
+            run_events(app, 0.05)
+        if win.reader is None:
+            shut_down(win)
+            raise RuntimeError(f"sim:// did not connect: {win.connector.error}")
+        run_events(app, 0.5)  # settle: first batch, plot creation
+
+        stages = {name: [] for name in ("tick", "drain", "log_write", "labels", "plot", "parse")}
+        lag = []
+        reader = win.reader
+        reader.drain = timed(reader.drain, stages["drain"])
+        reader.parser.feed = timed(reader.parser.feed, stages["parse"])
+        win.log.write = timed(win.log.write, stages["log_write"])
+        win.update_live_labels = timed(win.update_live_labels, stages["labels"])
+        win.redraw.render = timed(win.redraw.render, stages["plot"])
+
+        def tick():
+            start = time.perf_counter()
+            win.poll_serial()
+            stages["tick"].append((time.perf_counter() - start) * 1000)
+            latest = win.data.last()
+            if latest is not None:
+                lag.append((time.time() - (win.start_time + latest[0])) * 1000)
+
+        win.timer.timeout.disconnect()
+        win.timer.timeout.connect(tick)
+
+        rows_before = win.data.appended
+        dropped_before = reader.dropped_batches
+        overrun_before = win.connector.ser.overrun
+        start = time.perf_counter()
+        run_events(app, seconds)
+        elapsed = time.perf_counter() - start
+        rows = win.data.appended - rows_before
+
+        result = {
+            "rate": rate,
+            "sensor_count": sensor_count,
+            "seconds": elapsed,
+            "achieved_rate": rows / elapsed,
+            "dropped_batches": reader.dropped_batches - dropped_before,
+            "overrun_samples": win.connector.ser.overrun - overrun_before,
+            "missed_frames": reader.missed_frames,
+            "stage_ms": {name: percentiles(v) for name, v in stages.items()},
+            "lag_ms": percentiles(lag),
+        }
+        shut_down(win)
+        app.processEvents()
+
+    result["sustained"] = bool(
+        result["achieved_rate"] >= 0.95 * rate
+        and result["dropped_batches"] == 0
+        and result["overrun_samples"] == 0
+        and result["lag_ms"] is not None
+        and result["lag_ms"]["p95"] < LAG_LIMIT_S * 1000
+    )
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def smooth_history(rows, sensor_count):
+    # Slowly drifting temperatures like sim:// sends; random noise across the
+    # whole range would make every line segment span the plot and exaggerate
+    # the repaint cost several times over
+    t = np.arange(rows) * 0.01
+    channels = np.arange(2 * sensor_count)
+    history = np.empty((rows, 1 + 2 * sensor_count))
+    history[:, 0] = t
+    history[:, 1:] = 25 + 5 * channels + 3 * np.sin(2 * np.pi * t[:, None] / 60 + channels)
+    history[:, 1:] += np.random.default_rng(0).normal(0, 0.05, size=(rows, 2 * sensor_count))
+    return history
+
+
+def bench_plot_vs_buffer(app, sizes, sensor_count, calls=5):
+    # Cost of one new sample with every curve redrawn, against the number of
+    # rows in the plotted window (HISTORY_SECONDS * rate, capped by
+    # HISTORY_CAPACITY): update_plot itself, then Qt repainting the plots
+    use_sensor_count(sensor_count)
+    with tempfile.TemporaryDirectory() as folder:
+        gui.ROOT_LOG_DIR = folder
+        win = gui.SerialPlotter("sim://?boot=3600", BAUD)
+        win.timer.stop()
+        win.connector.stop()
+        win.resize(1500, 900)
+        win.show()
+
+        results = []
+        for size in sizes:
+            win.data = RingBuffer(size, 1 + 2 * sensor_count)
+            win.data.extend(smooth_history(size, sensor_count))
+            win.history_seconds = float("inf")
+            win.page.plotted_state.clear()
+            win.update_plot()
+            app.processEvents()
+
+            update, repaint = [], []
+            for _ in range(calls):
+                row = win.data.last().copy()
+                row[0] += 0.01
+                win.data.append(row)
+
+                start = time.perf_counter()
+                win.update_plot()
+                middle = time.perf_counter()
+                app.processEvents()
+                update.append((middle - start) * 1000)
+                repaint.append((time.perf_counter() - middle) * 1000)
+            results.append({"rows": size, "update_ms": percentiles(update), "repaint_ms": percentiles(repaint)})
+
+        shut_down(win)
+        app.processEvents()
+    return results
+
+
+def run_pipeline_suite(app, rates, sensor_counts, seconds, sizes):
+    suite = {"lag_limit_s": LAG_LIMIT_S, "runs": [], "max_sustained_rate": {}, "plot_vs_buffer": {}}
+
+    print(f"Pipeline: sim:// -> reader -> poll_serial -> log + plot ({seconds:g} s per rate, "
+          f"poll every {POLL_INTERVAL_MS} ms)")
+    print(f"{'sensors':>7} {'rate':>7} {'got/s':>8} {'tick p95':>9} {'plot p95':>9} "
+          f"{'lag p50':>8} {'lag p95':>8} {'RSS MB':>7}  ok")
+    for sensor_count in sensor_counts:
+        best = 0
+        for rate in rates:
+            r = bench_pipeline(app, rate, sensor_count, seconds)
+            suite["runs"].append(r)
+            lag = r["lag_ms"] or {"p50": float("nan"), "p95": float("nan")}
+            rss = r["peak_rss_mb"]
+            print(f"{sensor_count:>7} {rate:>7} {r['achieved_rate']:>8.0f} "
+                  f"{r['stage_ms']['tick']['p95']:>9.2f} {r['stage_ms']['plot']['p95']:>9.2f} "
+                  f"{lag['p50']:>8.0f} {lag['p95']:>8.0f} {rss if rss is not None else float('nan'):>7.0f}  "
+                  f"{'yes' if r['sustained'] else 'NO'}")
+            if not r["sustained"]:
+                break
+            best = rate
+        suite["max_sustained_rate"][str(sensor_count)] = best
+        print(f"{'':>7} max sustained: {best} samples/s")
+
+    print()
+    print("One new sample vs rows in the plotted window (ms, median)")
+    print(f"{'sensors':>7} {'rows':>8} {'update_plot':>12} {'repaint':>9}")
+    for sensor_count in sensor_counts:
+        rows = bench_plot_vs_buffer(app, sizes, sensor_count)
+        suite["plot_vs_buffer"][str(sensor_count)] = rows
+        for r in rows:
+            print(f"{sensor_count:>7} {r['rows']:>8} {r['update_ms']['p50']:>12.2f} {r['repaint_ms']['p50']:>9.1f}")
+    return suite
+
+
+# ---------------- JSON RESULTS ------------------
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pyqtgraph": pg.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+# Fields that identify an entry of a result list, so entries are matched by
+# meaning rather than position when two files are compared
+LIST_KEYS = ("sensor_count", "rate", "rows", "unit", "hidden", "format", "cold")
+
+
+def flatten(tree, prefix=""):
+    # {"a": {"b": 1}} -> {"a.b": 1}; lists are keyed by their rate/rows/sensor fields
+    out = {}
+    if isinstance(tree, dict):
+        for key, value in tree.items():
+            out.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(tree, list):
+        for k, value in enumerate(tree):
+            label = str(k)
+            if isinstance(value, dict):
+                label = ",".join(f"{f}={value[f]}" for f in LIST_KEYS if f in value) or label
+            out.update(flatten(value, f"{prefix}[{label}]."))
+    elif isinstance(tree, (int, float)) and not isinstance(tree, bool):
+        out[prefix[:-1]] = tree
+    return out
+
+
+def compare(old, new, threshold=0.10):
+    # Prints every number that moved by more than `threshold` (10 %)
+    before, after = flatten(old), flatten(new)
+    changed = []
+    for key in sorted(before.keys() & after.keys()):
+        if key.startswith("environment") or key.endswith(".count"):
+            continue
+        a, b = before[key], after[key]
+        if a and abs(b - a) / abs(a) > threshold:
+            changed.append((key, a, b))
+
+    print()
+    print(f"Compared with {old.get('environment', {}).get('commit')}: "
+          f"{len(changed)} of {len(before.keys() & after.keys())} numbers moved by more than {threshold:.0%}")
+    for key, a, b in changed:
+        print(f"  {key:<70} {a:>12.4g} -> {b:>12.4g} ({(b - a) / abs(a):+.0%})")
+
+
+# ---------------- SELF-CHECK ------------------
+
+def corrupt_stream(data, mode, row_bytes, rng):
+    # Damages a few rows of an encoded stream; returns the bytes and the
+    # rows that can no longer be decoded
+    rows = sorted(rng.choice(np.arange(1, len(row_bytes) - 2), size=3, replace=False).tolist())
+    starts = np.concatenate(([0], np.cumsum(row_bytes)))
+    data = bytearray(data)
+    a, b, c = rows
+    if mode == "text":
+        # A comma turned into junk, a lost newline (two lines run together)
+        # and a stray NUL in the middle of a number
+        line = data[starts[a]:starts[a + 1]]
+        data[starts[a] + line.index(b",")] = ord(";")
+        data[starts[c] + line.index(b".")] = 0
+        del data[starts[b + 1] - 1]
+        return bytes(data), {a, b, b + 1, c}
+    # A flipped bit in the values, a dropped byte and an unknown encoding
+    data[starts[a] + 12] ^= 0x10
+    data[starts[c] + 2] = 0x7F
+    del data[starts[b] + 5]
+    return bytes(data), {a, b, c}
+
+
+def check_parsers(sensor_count=8, rows=3000, chunkings=20):
+    # Every sim:// row must come out of the parser unchanged, whatever the
+    # chunk sizes, except the corrupted ones, which are counted as malformed
+    failures = []
+    for mode in ("text", "float32", "int16"):
+        dev = open_serial(f"sim://?sensors={sensor_count}&seed=1", BAUD)
+        dev.mode = mode
+        millis, values = dev._samples(0, rows)
+        values[rows // 3:rows // 3 + 5, 1] = np.nan    # unplugged sensor
+        encoded = [dev._encode(k, millis[k:k + 1], values[k:k + 1]) for k in range(rows)]
+        dev.close()
+
+        if mode == "float32":
+            expected = values.astype(np.float32).astype(np.float64)
+        else:
+            expected = np.round(values * 100) / 100
+
+        rng = np.random.default_rng(0)
+        for _ in range(chunkings):
+            data, lost = corrupt_stream(b"".join(encoded), mode, [len(e) for e in encoded], rng)
+            data = b"Simulated Arduino\r\nREADY\r\n" + data
+
+            parser = CsvChunkParser(2 * sensor_count) if mode == "text" else BinaryFrameParser(2 * sensor_count, mode)
+            cuts = np.cumsum(rng.integers(1, 600, size=len(data)))
+            cuts = np.concatenate(([0], cuts[cuts < len(data)], [len(data)]))
+            parts = [parser.feed(data[i:j]) for i, j in zip(cuts[:-1], cuts[1:])]
+            device_ms, seq, got = (np.concatenate(p) for p in zip(*parts))
+
+            keep = np.array([k for k in range(rows) if k not in lost])
+            if not np.array_equal(seq, keep):
+                failures.append(f"{mode}: wrong rows decoded ({len(seq)} of {len(keep)})")
+            elif not np.array_equal(device_ms, millis[keep]):
+                failures.append(f"{mode}: device times differ")
+            elif not np.allclose(got, expected[keep], rtol=0, atol=1e-9, equal_nan=True):
+                failures.append(f"{mode}: values differ")
+            elif parser.malformed < 3:
+                failures.append(f"{mode}: {parser.malformed} malformed counted for 3 corrupted rows")
+            if failures:
+                break
+    return failures
+
+
+class SlowSink:
+    # Log sink that keeps the rows and takes its time over each write
+    def __init__(self, delay):
+        self.delay = delay
+        self.rows = []
+
+    def writerows(self, rows):
+        time.sleep(self.delay)
+        self.rows.extend(rows)
+
+    def poll(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def check_spill_order(batches=3000, batch=5):
+    # With the queue overflowing into the spill file, every row must still
+    # reach the sink exactly once and in order
+    sink = SlowSink(0.0005)
+    writer = AsyncLogWriter(sink, max_batches=8, overflow="spill")
+    writer.start()
+    for k in range(batches):
+        writer.write([[k * batch + i] for i in range(batch)])
+        if k % 500 == 499:
+            time.sleep(0.3)    # let the writer catch up so spilling stops and starts again
+    writer.close()
+
+    got = np.array(sink.rows).ravel()
+    if not writer.spilled_rows:
+        return ["log: queue never overflowed, spill path not exercised"]
+    if writer.dropped_rows or not np.array_equal(got, np.arange(batches * batch)):
+        return [f"log: {len(got)} rows out of order or lost ({writer.dropped_rows} dropped)"]
+    return []
+
+
+def read_shared_rows(name, seconds):
+    # Runs in a separate Python, like any other client: every row the writer
+    # puts in the shared buffer holds its own row number in every column, so
+    # a torn copy shows up as mixed numbers or a gap. Prints "reads torn".
+    reader = SharedRingReader(name)
+    rng = np.random.default_rng()
+    reads = torn = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        rows = reader.snapshot(int(rng.integers(1, reader.capacity + 1)))
+        latest = reader.latest()
+        reads += 1
+        if len(rows) and ((rows != rows[:, :1]).any() or (np.diff(rows[:, 0]) != 1).any()):
+            torn += 1
+        if latest is not None and (latest[1] != latest[0] - 1).any():
+            torn += 1
+    reader.close()
+    print(reads, torn)
+
+
+def check_shared_reads(seconds=2.0, capacity=1000, width=17):
+    name = f"thermolog_selfcheck_{os.getpid()}"
+    buf = SharedRingBuffer(capacity, width, name)
+    child = subprocess.Popen(
+        [sys.executable, "-c", f"import bench; bench.read_shared_rows({name!r}, {seconds})"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.PIPE, text=True)
+
+    rng = np.random.default_rng(0)
+    written = 0
+    try:
+        while child.poll() is None:
+            n = int(rng.integers(1, 50))
+            buf.extend(np.repeat(np.arange(written, written + n, dtype=np.float64)[:, None], width, axis=1))
+            written += n
+        out = child.communicate()[0].split()
+    finally:
+        buf.close()
+
+    if child.returncode or len(out) != 2:
+        return [f"shared buffer: reader process failed (exit code {child.returncode})"]
+    reads, torn = map(int, out)
+    if not reads:
+        return ["shared buffer: reader never got a copy"]
+    if torn:
+        return [f"shared buffer: {torn} of {reads} reads torn"]
+    return []
+
+
+def selfcheck():
+    checks = [
+        ("parsers", "text, float32 and int16 sim:// streams, 3 corrupted rows, random chunks", check_parsers),
+        ("log spill", "slow sink, queue overflowing into the spill file", check_spill_order),
+        ("shared buffer", "second process reading while rows are written", check_shared_reads),
+    ]
+    failed = 0
+    for label, what, check in checks:
+        start = time.perf_counter()
+        failures = check()
+        print(f"{label:<14} {'FAIL' if failures else 'ok':<5} {time.perf_counter() - start:5.1f} s  {what}")
+        for failure in failures:
+            print("    " + failure)
+        failed += bool(failures)
+    return failed
+
+
+# ---------------- ENTRY POINT ------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--pipeline", action="store_true", help="also run the whole-pipeline suite")
+    parser.add_argument("--rates", type=int, nargs="+", default=[100, 300, 1000, 3000, 10000, 30000])
+    parser.add_argument("--sensors", type=int, nargs="+", default=[8, 16])
+    parser.add_argument("--seconds", type=float, default=3.0, help="run time per pipeline rate")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="plot window sizes for the plot-vs-buffer test")
+    parser.add_argument("--json", help="save results to this file")
+    parser.add_argument("--compare", help="earlier --json file to compare against")
+    parser.add_argument("--selfcheck", action="store_true", help="run the correctness checks instead")
+    args = parser.parse_args(argv)
+
+    if args.selfcheck:
+        sys.exit(1 if selfcheck() else 0)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    results = {"environment": environment(), "render": [], "parse": [], "log": []}
+
+    print("Render path: CPU ms per GUI tick (20000 samples in history)")
+    print(f"{'sensors':>7} {'unit':>4} {'hidden':>6} {'before':>9} {'after/new':>10} {'after/idle':>10}")
+    for sensor_count in (8, 16):
+        for unit, hidden in (("C", 0.0), ("F", 0.0), ("C", 0.5)):
+            r = bench_render(sensor_count, 20000, args.ticks, hidden, unit)
+            results["render"].append({"sensor_count": sensor_count, "unit": unit, "hidden": hidden, **r})
+            print(f"{sensor_count:>7} {unit:>4} {hidden:>6.0%} {r['before_ms']:>9.2f} "
+                  f"{r['after_new_data_ms']:>10.2f} {r['after_idle_ms']:>10.3f}")
+
+    print()
+    print("Line parsing: us per row (4 KiB chunks)")
+    print(f"{'sensors':>7} {'before':>8} {'after':>8}")
+    for sensor_count in (8, 16, 32):
+        r = bench_parse(sensor_count)
+        results["parse"].append({"sensor_count": sensor_count, **r})
+        print(f"{sensor_count:>7} {r['before_us']:>8.2f} {r['after_us']:>8.2f}")
+
+    print()
+    print("Log writer: rows/s (8 sensors, batches of 100 rows)")
+    for log_format in ("csv", "npy"):
+        for cold in (False, True):
+            label = "hot+cold" if cold else "hot only"
+            rows_per_s = bench_log(log_format, 8, cold)
+            results["log"].append({"format": log_format, "cold": int(cold), "rows_per_s": rows_per_s})
+            print(f"{log_format:>5} {label:>9} {rows_per_s:>12,.0f}")
+
+    if args.pipeline:
+        print()
+        results["pipeline"] = run_pipeline_suite(app, args.rates, args.sensors, args.seconds, args.rows)
+
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,35 @@
 '''
 These MUST match from the Arduino
 '''
-PORT = "COM3"
+PORT = "COM3"   # or "sim://?rate=100" / "replay://path/to/log.csv" to run without hardware (see simdevice.py)
 BAUD = 115200
 
 
+# How the Arduino sends readings:
+#   "text"    = comma separated text (works with any firmware)
+#   "float32" = compact binary frames, full precision
+#   "int16"   = smallest binary frames, 0.01 °C steps, limited to ±327 °C
+# Binary modes need the matching firmware; if it does not answer, text is used.
+SERIAL_PROTOCOL = "text"
+BINARY_ACK_TIMEOUT_S = 3.0
+
+
+'''
+Several Arduinos in one session (see devices.py). Leave DEVICES empty for the
+single board on PORT. Otherwise list every board with its port and the names
+of its sensors; the sensors of all boards are shown and logged together, in
+this order, and each name must be unique.
+'''
+DEVICES = [
+    # {"port": "COM3", "names": ["A1", "A2", "A3", "A4", "A5", "A6", "A7", "A8"]},
+    # {"port": "COM4", "names": ["B1", "B2", "B3", "B4", "B5", "B6", "B7", "B8"]},
+]
+DEVICE_MERGE_PERIOD_S = 0.1     # Time grid of merged rows; a row is written only when a board has a new reading
+DEVICE_MERGE_LATENCY_S = 0.5    # Longest wait for a late board before a row is written without it
+DEVICE_STALE_S = 5.0            # Readings older than this are left empty (nan) in a merged row;
+                                # keep it well above the slowest board's sample period (~1.1 s)
+
+
 '''
 These parameters change the folder names and file names
 '''
@@ -18,8 +43,26 @@ ROOT_LOG_DIR = "DataLog"
 These parameters adjust the view
 '''
 HISTORY_SECONDS = 60
+HISTORY_CAPACITY = 20000    # Most samples kept in memory for plotting
+LOD_POINTS_PER_PIXEL = 2    # Beyond this many samples per pixel, curves are drawn as min/max envelopes
+
+# The whole session is also archived on disk (DataLog/.../archive) so the plot
+# can pan and zoom back past HISTORY_CAPACITY, to the start of the run
+ARCHIVE_ENABLED = True
+ARCHIVE_TIERS_S = (1, 10, 60)   # Min/max summary widths in seconds; each must divide the next
+ARCHIVE_MAX_ROWS = 200000       # Most archive rows read for one redraw
 POLL_INTERVAL_MS = 100
 VIEW_MODE_DEFAULT = "merged"
+LIVE_REFRESH_MS = 500       # How often the Live Values panel is redrawn
+STATS_WINDOW_S = 60         # Live mean, std, min/max and rate of change cover this many seconds
+
+# The plot is redrawn when something changed, at most RENDER_FPS times a second.
+# If redraws take longer than RENDER_BUDGET of that time, the rate is lowered
+# (down to RENDER_MIN_FPS) so the window stays responsive. Nothing is redrawn
+# while the window is minimized or hidden.
+RENDER_FPS = 30
+RENDER_MIN_FPS = 2
+RENDER_BUDGET = 0.5
 
 # Default GUI temperature units: "C" or "F"
 TEMP_UNIT = "C"
@@ -81,4 +124,81 @@ CURVE_COLORS = {
     "hot5":  (0, 128, 128),     "cold5": (0, 90, 90),
     "hot6":  (128, 128, 0),     "cold6": (90, 90, 0),
     "hot7":  (255, 20, 147),    "cold7": (180, 10, 100),
-}
\ No newline at end of file
+}
+
+'''
+These parameters tune the background serial reader
+'''
+CONNECT_TIMEOUT_S = 10.0    # Give up if the Arduino has not answered by then
+LIVE_PROBE_S = 1.5          # Listen this long for a running Arduino before resetting it
+READ_TIMEOUT_S = 0.1        # How long one blocking read waits before checking for shutdown
+READ_QUEUE_BATCHES = 1000   # Batches buffered for the GUI before the oldest is dropped
+SERIAL_READ_BLOCK = 4096    # Largest single read from the port, in bytes
+CLOCK_FIT_MEMORY = 3600     # Readings used to track the Arduino clock's drift
+STATUS_INTERVAL_S = 60.0    # Headless mode (main.py --headless): seconds between status lines
+
+
+'''
+Live stream for other programs on this PC (see publish.py)
+'''
+STREAM_ENABLED = False          # True = serve live readings while acquiring
+STREAM_HOST = "127.0.0.1"       # "0.0.0.0" to also accept other PCs on the network
+STREAM_PORT = 5757
+STREAM_QUEUE_BATCHES = 256      # Batches held per subscriber before its oldest are dropped
+
+# Name of a shared memory block holding the newest HISTORY_CAPACITY readings,
+# for programs on this PC that need them with minimal delay (see sharedbuffer.py).
+# None = off
+SHARED_BUFFER_NAME = None       # e.g. "thermolog"
+
+
+'''
+Alarms (see alarms.py). Each rule applies to every channel whose name
+matches "channel": a name such as "TC1_Hot", or a pattern ("*_Hot" = every
+thermocouple, "TC*_Cold" = every cold junction). Settings, all optional:
+  "high" / "low"     alarm above / below this temperature (°C)
+  "hysteresis"       °C back inside the limit before the alarm clears
+  "rise_per_min"     alarm when rising faster than this many °C per minute
+  "fault"            True = alarm when the sensor stops giving readings (nan)
+Alarms are highlighted in the Live Values panel and written to alarms.csv
+next to the log.
+'''
+ALARM_RULES = [
+    {"channel": "*_Hot", "fault": True},
+    # {"channel": "TC1_Hot", "high": 80.0, "low": 5.0, "hysteresis": 1.0},
+    # {"channel": "*_Hot", "rise_per_min": 10.0},
+]
+ALARM_FAULT_SAMPLES = 3         # nan readings in a row before a sensor fault
+ALARM_RATE_WINDOW_S = 10.0      # Rate of rise is measured over this many seconds
+ALARM_RATE_HYSTERESIS = 0.2     # Rate alarm clears below (1 - this) x the limit
+ALARM_LATENCY_BUDGET_MS = 250   # Serial-arrival-to-alarm time above this is counted as over budget
+
+
+'''
+Log file format:
+  "csv" = text, opens in Excel
+  "npy" = binary NumPy file, much smaller and loads in seconds.
+          Convert to CSV with:  python logsink.py <file.npy>
+'''
+LOG_FORMAT = "csv"
+
+# False = log only the thermocouple (Hot) channels
+# True  = also log each sensor's cold-junction (Cold) reading, for drift correction
+LOG_COLD_JUNCTION = False
+
+
+'''
+These parameters control how often the log is written to disk.
+Rows are buffered and flushed when any one of the limits is reached.
+'''
+LOG_FLUSH_ROWS = 50             # Rows
+LOG_FLUSH_BYTES = 64 * 1024     # Bytes of pending log data
+LOG_FLUSH_INTERVAL_S = 2.0      # Seconds since the last flush
+LOG_FSYNC = False               # True = force every flush to disk (crash safe, slower)
+
+# The log is written on its own thread. When its queue is full:
+#   "block"       = wait for the disk (acquisition/GUI may stall)
+#   "drop_oldest" = throw away the oldest queued rows
+#   "spill"       = park rows in a temp file until the disk catches up
+LOG_QUEUE_BATCHES = 256
+LOG_OVERFLOW_POLICY = "spill"
@@ -0,0 +1,137 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from ringbuffer import RingBuffer
+
+
+# ---------------- MIN/MAX DECIMATION ------------------
+
+# Bucket widths are this times a power of two, so small changes of the plotted
+# span or plot width map onto the same cached zoom level
+LOD_BASE_S = 0.001
+
+
+def envelope_buckets(times, lows, highs, width):
+    """
+    Min of `lows` and max of `highs` per time bucket, for every channel.
+
+    `times` must be sorted; buckets are the fixed grid floor(time / width), so
+    a bucket's contents never depend on where the rows started. Returns
+    (bucket ids, index of each bucket's first row, mins, maxs). NaN readings
+    are ignored unless a bucket has nothing else.
+    """
+    ids = np.floor(times / width)
+    starts = np.flatnonzero(np.diff(ids)) + 1
+    starts = np.concatenate(([0], starts))
+    return ids[starts], starts, np.fmin.reduceat(lows, starts, axis=0), np.fmax.reduceat(highs, starts, axis=0)
+
+
+def minmax_buckets(rows, width):
+    # Same for raw [time, channels...] rows
+    return envelope_buckets(rows[:, 0], rows[:, 1:], rows[:, 1:], width)
+
+
+def envelope_points(ids, mins, maxs, width):
+    # Two points per bucket at its centre, min then max: drawn as one
+    # vertical stroke per bucket, exactly covering the raw samples
+    x = np.repeat((ids + 0.5) * width, 2)
+    y = np.empty((2 * len(ids), mins.shape[1]))
+    y[0::2] = mins
+    y[1::2] = maxs
+    return x, y
+
+
+class MinMaxEnvelope:
+    """
+    Per-bucket min/max of a RingBuffer's channels at one bucket width.
+
+    Buckets are stored as rows of [bucket id, mins..., maxs...] in a
+    RingBuffer of their own. update() only looks at rows added since the
+    previous call plus the still-open last bucket, using the data buffer's
+    `appended` counter to tell which rows those are.
+    """
+
+    def __init__(self, width, channels, capacity):
+        self.width = width
+        self.channels = channels
+        self.buckets = RingBuffer(capacity, 1 + 2 * channels)
+
+        self._data = None
+        self._next_row = 0   # absolute index of the open bucket's first row
+        self._open = False   # last stored bucket may still grow
+
+    def update(self, data):
+        first = data.appended - len(data)  # absolute index of data.view()[0]
+        if data is not self._data or self._next_row < first:
+            # New buffer, or rows fell out before they were summarised
+            self._data = data
+            self.buckets.clear()
+            self._next_row = first
+            self._open = False
+
+        start = self._next_row - first
+        rows = data.view()[start:]
+        if not len(rows):
+            return
+
+        ids, starts, mins, maxs = minmax_buckets(rows, self.width)
+        if self._open:
+            self.buckets.pop()
+        self.buckets.extend(np.column_stack((ids, mins, maxs)))
+        self._open = True
+        self._next_row = first + start + int(starts[-1])
+
+    def window(self, t0, t1):
+        # (x, y) envelope points for buckets overlapping [t0, t1]
+        id0, id1 = math.floor(t0 / self.width), math.floor(t1 / self.width)
+        b = self.buckets.view()
+        if not len(b) or b[0, 0] > id0:
+            # Older than what is kept: summarise those raw rows directly
+            data = self._data
+            rows = data.view()[data.search(id0 * self.width):data.search((id1 + 1) * self.width)]
+            if not len(rows):
+                return np.empty(0), np.empty((0, self.channels))
+            ids, _, mins, maxs = minmax_buckets(rows, self.width)
+        else:
+            i0 = int(np.searchsorted(b[:, 0], id0, side="left"))
+            i1 = int(np.searchsorted(b[:, 0], id1, side="right"))
+            ids = b[i0:i1, 0]
+            mins = b[i0:i1, 1:1 + self.channels]
+            maxs = b[i0:i1, 1 + self.channels:]
+        return envelope_points(ids, mins, maxs, self.width)
+
+
+class LodCache:
+    """
+    Min/max envelopes of the plot history, one MinMaxEnvelope per zoom level.
+
+    envelope() picks the level whose bucket width is the largest power-of-two
+    step not above `seconds_per_pixel`, so every pixel column gets one or two
+    buckets (two to four points) however many samples the window holds. The
+    `max_levels` most recently used levels are kept and brought up to date
+    incrementally.
+    """
+
+    def __init__(self, channels, max_levels=6):
+        self.channels = channels
+        self.max_levels = max_levels
+        self.levels = OrderedDict()
+
+    def envelope(self, data, t0, t1, seconds_per_pixel, pixels):
+        # Returns (x, y, key); key identifies the zoom level and bucket range
+        level = max(0, math.floor(math.log2(seconds_per_pixel / LOD_BASE_S)))
+        env = self.levels.get(level)
+        if env is None:
+            width = LOD_BASE_S * 2 ** level
+            # Room for a zoomed view plus a screen either side at two buckets per pixel
+            env = MinMaxEnvelope(width, self.channels, capacity=max(1024, 8 * pixels))
+            self.levels[level] = env
+            while len(self.levels) > self.max_levels:
+                self.levels.popitem(last=False)
+        self.levels.move_to_end(level)
+
+        env.update(data)
+        x, y = env.window(t0, t1)
+        return x, y, (level, math.floor(t0 / env.width), math.floor(t1 / env.width))
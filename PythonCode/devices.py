@@ -0,0 +1,256 @@
+'''
+Several Arduinos in one session.
+
+Every board in DEVICES (config.py) gets its own SerialConnector and
+SerialReader, all running at once. DeviceManager drains the readers on a
+thread of its own and merges them onto one time grid: every
+DEVICE_MERGE_PERIOD_S there is one row holding each board's newest reading
+at that instant. The GUI, the log and the archive therefore see a single
+set of sensors (the first board's [hot, cold] pairs, then the second
+board's, ...) as if it were one big Arduino, and do no per-board work.
+
+Readings are already on the PC clock (see DeviceClock), so the boards need
+no shared clock. A grid instant is written once every board has reported
+past it, or DEVICE_MERGE_LATENCY_S later if one is behind, and only if at
+least one board has a reading there that no earlier row holds: boards
+slower than the grid give one row per new reading, not a copy of it at
+every grid step. A board whose newest reading is older than DEVICE_STALE_S
+at that instant gets nan, so DEVICE_STALE_S must be well above the slowest
+board's sample period.
+
+With DEVICES empty the single board on PORT is read directly, without the
+grid, exactly as before.
+'''
+import time
+import threading
+from collections import namedtuple
+
+import numpy as np
+import serial
+
+from config import *
+from acquisition import DropOldestQueue, SerialConnector, SerialReader, join_batches
+
+
+Device = namedtuple("Device", ["port", "names"])
+
+
+def session_devices(port=None, sensor_count=SENSOR_COUNT, sensor_names=SENSOR_NAMES, devices=DEVICES):
+    # The boards of a session. An explicit port means one board, even if
+    # DEVICES is set.
+    if port is not None or not devices:
+        return [Device(port or PORT, list(sensor_names[:sensor_count]))]
+
+    boards = [Device(d["port"], list(d["names"])) for d in devices]
+    names = [name for d in boards for name in d.names]
+    if len(set(names)) != len(names):
+        raise ValueError("Sensor names in DEVICES must be unique across all boards")
+    return boards
+
+
+def sensor_names(devices):
+    return [name for d in devices for name in d.names]
+
+
+def describe(devices):
+    return ", ".join(d.port for d in devices)
+
+
+def start_connector(devices, baud):
+    if len(devices) == 1:
+        connector = SerialConnector(devices[0].port, baud, len(devices[0].names))
+    else:
+        connector = MultiConnector(devices, baud)
+    connector.start()
+    return connector
+
+
+def start_reader(devices, connector):
+    # One SerialReader, or a DeviceManager merging one per board; both have
+    # the same drain() / rates() / stop() interface
+    if len(devices) == 1:
+        reader = SerialReader(connector.ser, len(devices[0].names), connector.protocol, connector.leftover)
+    else:
+        reader = DeviceManager(devices, connector.connectors)
+    reader.start()
+    return reader
+
+
+# ---------------- CONNECTING ------------------
+
+class MultiConnector:
+    """
+    SerialConnector for several boards: they are connected in parallel and
+    it is done when all of them are. If one fails, the others are stopped
+    and `error` names the port that failed.
+    """
+
+    def __init__(self, devices, baud):
+        self.connectors = [SerialConnector(d.port, baud, len(d.names)) for d in devices]
+        self.started = time.monotonic()
+
+    def start(self):
+        for c in self.connectors:
+            c.start()
+
+    def is_alive(self):
+        if self.error is not None:
+            self.stop()
+        return any(c.is_alive() for c in self.connectors)
+
+    def join(self, timeout=None):
+        for c in self.connectors:
+            c.join(timeout)
+
+    def stop(self):
+        for c in self.connectors:
+            c.stop()
+
+    def close(self):
+        for c in self.connectors:
+            c.close()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def status(self):
+        waiting = [f"{c.port}: {c.status}" for c in self.connectors if c.is_alive()]
+        return "; ".join(waiting) or "Connected"
+
+    @property
+    def error(self):
+        for c in self.connectors:
+            if c.error is not None:
+                return serial.SerialException(f"{c.port}: {c.error}")
+        return None
+
+
+# ---------------- MERGING ------------------
+
+class DeviceManager(threading.Thread):
+    """
+    Runs one SerialReader per board and hands their readings to the GUI as
+    merged (timestamps, values, arrived) batches on the DEVICE_MERGE_PERIOD_S
+    grid, through a bounded queue like SerialReader's. A row's `arrived` is
+    the latest arrival time of the readings in it. Counters and rates() are
+    totals over all boards. A serial error on any board stops every reader
+    and is reported in `error`.
+    """
+
+    def __init__(self, devices, connectors, period=DEVICE_MERGE_PERIOD_S, latency=DEVICE_MERGE_LATENCY_S,
+                 stale=DEVICE_STALE_S, max_batches=READ_QUEUE_BATCHES):
+        super().__init__(name="DeviceManager", daemon=True)
+        self.devices = devices
+        self.readers = [
+            SerialReader(c.ser, len(d.names), c.protocol, c.leftover)
+            for d, c in zip(devices, connectors)
+        ]
+        self.protocol = "/".join(sorted({r.protocol for r in self.readers}))
+
+        widths = [2 * len(d.names) for d in devices]
+        self.offsets = np.concatenate(([0], np.cumsum(widths)))
+        self.channels = int(self.offsets[-1])
+
+        self.period = period
+        self.latency = latency
+        self.stale = stale
+
+        # Per board: readings not yet merged, plus the newest one already used
+        self._pending = [(np.empty(0), np.empty((0, w)), np.empty(0)) for w in widths]
+        self._used = np.full(len(devices), -np.inf)   # Time of each board's newest reading in a row
+        self._next_tick = None   # grid index of the next row
+
+        self.batches = DropOldestQueue(max_batches)
+        self.error = None
+
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def malformed(self):
+        return sum(r.malformed for r in self.readers)
+
+    @property
+    def dropped_batches(self):
+        return self.batches.dropped
+
+    @property
+    def missed_frames(self):
+        return sum(r.missed_frames for r in self.readers)
+
+    def rates(self):
+        totals = {"bytes_per_s": 0.0, "lines_per_s": 0.0, "reads_per_s": 0.0}
+        for r in self.readers:
+            for key, value in r.rates().items():
+                totals[key] += value
+        return totals
+
+    def run(self):
+        for r in self.readers:
+            r.start()
+        try:
+            while not self._stop_event.wait(min(self.period, READ_TIMEOUT_S)):
+                self._merge(time.time())
+                failed = next(((d, r) for d, r in zip(self.devices, self.readers) if r.error is not None), None)
+                if failed is not None:
+                    self.error = serial.SerialException(f"{failed[0].port}: {failed[1].error}")
+                    break
+        finally:
+            for r in self.readers:
+                r.stop()
+            for r in self.readers:
+                r.join(timeout=2)
+            self._merge(time.time())
+
+    def _merge(self, now):
+        for k, r in enumerate(self.readers):
+            batch = r.drain()
+            if len(batch[0]):
+                self._pending[k] = tuple(np.concatenate(pair) for pair in zip(self._pending[k], batch))
+
+        heard = [pending[0] for pending in self._pending if len(pending[0])]
+        if not heard:
+            return
+        if self._next_tick is None:
+            self._next_tick = int(np.ceil(min(s[0] for s in heard) / self.period))
+
+        # Rows up to where every board has reported, or as far as a late board
+        # is waited for
+        newest = min(s[-1] for s in heard) if len(heard) == len(self._pending) else -np.inf
+        horizon = max(newest, now - self.latency)
+        last_tick = int(np.floor(horizon / self.period))
+        if last_tick < self._next_tick:
+            return
+
+        ticks = np.arange(self._next_tick, last_tick + 1) * self.period
+        self._next_tick = last_tick + 1
+
+        merged = np.full((len(ticks), self.channels), np.nan)
+        fresh = np.zeros(len(ticks), dtype=bool)
+        arrived = np.full(len(ticks), -np.inf)
+        for k, (stamps, values, arrivals) in enumerate(self._pending):
+            if not len(stamps):
+                continue
+            # Newest reading at or before each instant, if it is recent enough
+            i = np.searchsorted(stamps, ticks, side="right") - 1
+            newest = np.where(i >= 0, stamps[np.maximum(i, 0)], -np.inf)
+            ok = (i >= 0) & (ticks - newest <= self.stale)
+            merged[ok, self.offsets[k]:self.offsets[k + 1]] = values[i[ok]]
+            arrived[ok] = np.maximum(arrived[ok], arrivals[i[ok]])
+
+            # Instants where this board has a reading not yet in any row
+            fresh |= newest > np.maximum.accumulate(np.concatenate(([self._used[k]], newest[:-1])))
+            self._used[k] = max(self._used[k], newest[-1])
+
+            keep = max(int(i[-1]), 0)
+            self._pending[k] = (stamps[keep:], values[keep:], arrivals[keep:])
+
+        if fresh.any():
+            arrived = np.where(np.isfinite(arrived), arrived, ticks)
+            self.batches.offer((ticks[fresh], merged[fresh], arrived[fresh]))
+
+    def drain(self):
+        return join_batches(self.batches.take_all(), (np.empty(0), np.empty((0, self.channels)), np.empty(0)))
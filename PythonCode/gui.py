@@ -0,0 +1,1027 @@
+import sys
+import os
+import time
+from collections import deque
+import numpy as np
+from config import *
+from ringbuffer import RingBuffer
+from sharedbuffer import SharedRingBuffer
+from stats import RollingStats
+from alarms import AlarmEngine, AlarmLog, describe as describe_alarm
+from decimate import LodCache
+from archive import ArchiveReader, SessionArchive
+from logsink import AsyncLogWriter, build_output_path, log_block, log_channels, log_columns, open_log_sink
+from simdevice import is_simulated
+from publish import start_publisher
+from devices import describe, sensor_names, session_devices, start_connector, start_reader
+
+from PyQt5 import QtWidgets, QtCore
+from PyQt5.QtCore import QUrl
+from PyQt5.QtGui import QDesktopServices
+import pyqtgraph as pg
+
+# NEW: for listing available ports
+from serial.tools import list_ports
+
+
+# ---------------- STARTUP PORT PICKER ------------------
+
+class PortSelectDialog(QtWidgets.QDialog):
+    def __init__(self, ports, default_port=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Select COM Port")
+        self.setModal(True)
+
+        layout = QtWidgets.QVBoxLayout(self)
+
+        layout.addWidget(QtWidgets.QLabel("Select the COM port for the Arduino:"))
+
+        # Editable, so a sim:// or replay:// URL can be typed in
+        self.combo = QtWidgets.QComboBox()
+        self.combo.setEditable(True)
+        for p in ports:
+            self.combo.addItem(p)
+        layout.addWidget(self.combo)
+
+        # Preselect default if present
+        if default_port and default_port in ports:
+            self.combo.setCurrentText(default_port)
+
+        btn_row = QtWidgets.QHBoxLayout()
+        self.btn_ok = QtWidgets.QPushButton("OK")
+        self.btn_cancel = QtWidgets.QPushButton("Close")
+        btn_row.addWidget(self.btn_ok)
+        btn_row.addWidget(self.btn_cancel)
+        layout.addLayout(btn_row)
+
+        self.btn_ok.clicked.connect(self.accept)
+        self.btn_cancel.clicked.connect(self.reject)
+
+    def selected_port(self):
+        return self.combo.currentText().strip()
+
+
+def choose_serial_port(default_port=None, parent=None):
+    # Get ports like "COM3", "COM4", etc.
+    detected = [p.device for p in list_ports.comports()]
+    if is_simulated(default_port):
+        detected.append(default_port)
+
+    if not detected:
+        QtWidgets.QMessageBox.critical(
+            parent,
+            "No COM Ports Found",
+            "No serial (COM) ports were detected.\n\n"
+            "Plug in the Arduino and try again."
+        )
+        return None
+
+    dlg = PortSelectDialog(detected, default_port=default_port, parent=parent)
+    if dlg.exec_() == QtWidgets.QDialog.Accepted:
+        return dlg.selected_port()
+    return None
+
+
+# ---------------- RENDER SCHEDULER ------------------
+
+class RenderScheduler(QtCore.QObject):
+    """
+    Coalesces redraw requests into frames. request() only marks the plot
+    dirty; one frame then redraws everything requested since the last one,
+    at most `fps` times a second. A frame's cost is `render` plus the Qt
+    painting that follows it (reported by TimedPlotWidget). When frames take
+    longer than `budget` of the frame interval, the interval grows (down to
+    `min_fps`) and shrinks again as they speed up. While the window is
+    minimized or hidden nothing is drawn; the window requests a frame when it
+    is shown again.
+    """
+
+    def __init__(self, window, render, fps=RENDER_FPS, min_fps=RENDER_MIN_FPS, budget=RENDER_BUDGET):
+        super().__init__(window)
+        self.window = window
+        self.render = render
+        self.min_interval = 1 / fps
+        self.max_interval = 1 / min_fps
+        self.budget = budget
+        self.interval = self.min_interval
+
+        self.dirty = False
+        self.requests = 0
+        self.frames = 0
+        self.frame_ms = 0.0        # Smoothed time per frame
+        self.max_frame_ms = 0.0
+        self._last_frame = -np.inf
+        self._frame_starts = deque()   # Recent frames, for the achieved rate
+
+        # Cost of the latest frame so far; painting is added as it happens
+        self._render_s = None
+        self._paint_s = 0.0
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._frame)
+
+    def request(self, *_):
+        # Also connected to Qt signals, whose arguments are not needed
+        self.requests += 1
+        self.dirty = True
+        if self.timer.isActive() or self.hidden():
+            return
+        wait = self._last_frame + self.interval - time.monotonic()
+        self.timer.start(int(max(wait, 0.0) * 1000))
+
+    def hidden(self):
+        return self.window.isMinimized() or not self.window.isVisible()
+
+    def stop(self):
+        self.timer.stop()
+        self.dirty = False
+
+    def add_paint(self, seconds):
+        self._paint_s += seconds
+
+    def _frame(self):
+        if not self.dirty or self.hidden():
+            return
+        self.dirty = False
+        self._account()
+
+        start = time.monotonic()
+        self.render()
+        self._render_s = time.monotonic() - start
+        self._paint_s = 0.0
+
+        self.frames += 1
+        self._last_frame = start
+        self._frame_starts.append(start)
+        while self._frame_starts[0] < start - 2.0:
+            self._frame_starts.popleft()
+
+        if self.dirty:
+            # Requested while drawing
+            self.timer.start(int(self.interval * 1000))
+
+    def _account(self):
+        # Settles the previous frame, now that its painting is done
+        if self._render_s is None:
+            return
+        ms = (self._render_s + self._paint_s) * 1000
+        self.frame_ms = ms if self.frames == 1 else 0.8 * self.frame_ms + 0.2 * ms
+        self.max_frame_ms = max(self.max_frame_ms, ms)
+
+        # Frames may use `budget` of the time between them
+        needed = self.frame_ms / 1000 / self.budget
+        self.interval = min(max(needed, self.min_interval), self.max_interval)
+
+    def stats(self):
+        # Achieved frames per second over the last 2 s, the rate currently
+        # aimed for, and frame times in ms
+        now = time.monotonic()
+        recent = sum(t >= now - 2.0 for t in self._frame_starts)
+        return {
+            "fps": recent / 2.0,
+            "target_fps": 1 / self.interval,
+            "frame_ms": self.frame_ms,
+            "max_frame_ms": self.max_frame_ms,
+            "frames": self.frames,
+            "coalesced": self.requests - self.frames,
+        }
+
+
+class TimedPlotWidget(pg.PlotWidget):
+    # Qt paints the plots after update_plot has returned; this reports how
+    # long that takes to the RenderScheduler
+
+    def __init__(self, scheduler, title):
+        super().__init__()
+        self.scheduler = scheduler
+        self.title = title   # Left axis label, without the unit
+
+    def paintEvent(self, event):
+        start = time.monotonic()
+        super().paintEvent(event)
+        self.scheduler.add_paint(time.monotonic() - start)
+
+
+class PlotPage:
+    # One view layout (merged / split2): its plots and curves, and what was
+    # last drawn on them. Pages are kept once built, so switching views only
+    # changes which one is shown.
+
+    def __init__(self):
+        self.widget = QtWidgets.QWidget()
+        self.layout = QtWidgets.QGridLayout(self.widget)
+        self.plot_widgets = []
+        self.curves_plot = {}
+        self.plotted_state = {}
+        self.applied_ranges = None
+
+
+# ---------------- MAIN GUI CLASS ------------------
+
+class SerialPlotter(QtWidgets.QMainWindow):
+    def __init__(self, port, baud, parent=None):
+        super().__init__(parent)
+
+        # One board on `port`, or every board in DEVICES when no port is given
+        self.devices = session_devices(port, SENSOR_COUNT, SENSOR_NAMES)
+        self.sensor_names = sensor_names(self.devices)
+        self.sensor_count = len(self.sensor_names)
+        self.port = describe(self.devices)
+        self.baud = baud
+
+        self.view_mode = VIEW_MODE_DEFAULT
+        self.history_seconds = HISTORY_SECONDS
+        self.start_time = time.time()
+
+        # Set up once the Arduino answers (see on_connected)
+        self.reader = None
+        self.log = None
+        self.archive = None
+        self.archive_log = None
+        self.publisher = None
+        self.alarm_log = None
+
+        # Data storage: one row per sample, [time, hot0, cold0, hot1, cold1, ...]
+        # (in shared memory with SHARED_BUFFER_NAME, for other processes)
+        if SHARED_BUFFER_NAME:
+            self.data = SharedRingBuffer(HISTORY_CAPACITY, 1 + 2 * self.sensor_count, SHARED_BUFFER_NAME)
+        else:
+            self.data = RingBuffer(HISTORY_CAPACITY, 1 + 2 * self.sensor_count)
+        self.columns = {f"hot{i}": 1 + 2 * i for i in range(self.sensor_count)}
+        self.columns.update({f"cold{i}": 2 + 2 * i for i in range(self.sensor_count)})
+
+        # Min/max envelopes per zoom level, for windows with more samples than pixels
+        self.lod = LodCache(2 * self.sensor_count)
+
+        # Rolling mean/std/min/max/slope per channel for the Live Values panel;
+        # live_stats() returns them by channel name
+        self.stats = RollingStats(2 * self.sensor_count)
+        self.live_refresh_time = 0.0
+
+        # ALARM_RULES, checked on every batch as it is drained
+        self.alarms = AlarmEngine(log_columns(self.sensor_names, cold_junction=True)[2:])
+
+        # Plot redraws are requested, not done on the spot (see RenderScheduler)
+        self.redraw = RenderScheduler(self, self.update_plot)
+
+        # Build UI
+        self.init_ui()
+
+        # Connect in the background so the window shows up straight away
+        self.connector = start_connector(self.devices, self.baud)
+
+        # Serial polling timer
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.poll_serial)
+        self.timer.start(POLL_INTERVAL_MS)
+
+    # ---------- Connection ----------
+
+    def check_connection(self):
+        c = self.connector
+        if c.is_alive():
+            self.statusBar().showMessage(f"Connecting to {self.port}: {c.status}... ({c.elapsed():.1f} s)")
+            return
+
+        if c.error is not None:
+            self.timer.stop()
+            self.statusBar().showMessage(f"Could not connect to {self.port}")
+            QtWidgets.QMessageBox.critical(
+                self,
+                "Serial Connection Error",
+                f"Could not connect to {self.port} at {self.baud} baud.\n\n{c.error}"
+            )
+            self.close()
+            return
+
+        self.on_connected(c)
+
+    def on_connected(self, c):
+        self.start_time = time.time()
+        if SHARED_BUFFER_NAME:
+            self.data.epoch = self.start_time
+
+        # Set up CSV logging
+        self.output_file = build_output_path(ROOT_LOG_DIR, self.sensor_count)
+        self.output_dir = os.path.dirname(self.output_file)  # NEW: directory for end-of-program message
+
+        self.log = AsyncLogWriter(open_log_sink(self.output_file, log_columns(self.sensor_names)))
+        self.logged = log_channels(self.sensor_count)
+        self.log.start()
+        self.alarm_log = AlarmLog(os.path.join(self.output_dir, "alarms.csv"), self.start_time)
+
+        # Whole-session history for looking back past the ring buffer
+        if ARCHIVE_ENABLED:
+            archive_dir = os.path.join(self.output_dir, "archive")
+            self.archive_log = AsyncLogWriter(SessionArchive(archive_dir, self.sensor_names))
+            self.archive_log.start()
+            self.archive = ArchiveReader(archive_dir, self.sensor_names)
+
+        # Live readings for other programs (publish.py)
+        if STREAM_ENABLED:
+            self.publisher = start_publisher(self.sensor_names)
+
+        # Serial reading happens on its own thread(s); the timer only consumes
+        self.reader = start_reader(self.devices, c)
+
+        self.statusBar().showMessage(f"Connected to {self.port} after {c.elapsed():.1f} s", 5000)
+
+    # ---------- Conversion ----------
+
+    def convert_temp(self, celsius):
+        if TEMP_UNIT == "F":
+            return celsius * 9/5 + 32
+        return celsius
+
+    def unit_scale(self):
+        # (scale, offset) so that display = celsius * scale + offset
+        if TEMP_UNIT == "F":
+            return 9/5, 32.0
+        return 1.0, 0.0
+
+    def unit_suffix(self):
+        return "°F" if TEMP_UNIT == "F" else "°C"
+
+    # ---------- UI Setup ----------
+
+    def init_ui(self):
+        self.setWindowTitle("Thermocouple Logger (Arduino)")
+
+        central = QtWidgets.QWidget()
+        self.setCentralWidget(central)
+        main_layout = QtWidgets.QHBoxLayout(central)
+
+        # ---------------- PLOTS ----------------
+        # One page per view mode, built the first time it is shown
+        self.plot_stack = QtWidgets.QStackedWidget()
+        main_layout.addWidget(self.plot_stack, stretch=3)
+
+        # ---------------- CONTROL PANEL ----------------
+        control_panel = QtWidgets.QWidget()
+        control_layout = QtWidgets.QVBoxLayout(control_panel)
+
+        # -------- UNIT TOGGLE ----------
+        unit_box = QtWidgets.QGroupBox("Temperature Units")
+        ul = QtWidgets.QHBoxLayout(unit_box)
+
+        self.btn_unit_c = QtWidgets.QPushButton("°C")
+        self.btn_unit_f = QtWidgets.QPushButton("°F")
+
+        self.btn_unit_c.setCheckable(True)
+        self.btn_unit_f.setCheckable(True)
+        self.btn_unit_c.setChecked(True)
+
+        self.btn_unit_c.clicked.connect(lambda: self.change_units("C"))
+        self.btn_unit_f.clicked.connect(lambda: self.change_units("F"))
+
+        ul.addWidget(self.btn_unit_c)
+        ul.addWidget(self.btn_unit_f)
+        control_layout.addWidget(unit_box)
+
+        # -------- LIVE READOUT PANEL ----------
+        live_box = QtWidgets.QGroupBox("Live Values")
+        live_layout = QtWidgets.QVBoxLayout(live_box)
+
+        self.live_labels = {}
+
+        for i in range(self.sensor_count):
+            label = QtWidgets.QLabel(
+                f"{self.sensor_names[i]}:  {HOT_LABEL} 0000.00 °C   {COLD_LABEL} 0000.00 °C"
+            )
+            label.setStyleSheet("font-family: Consolas; font-size: 12pt;")
+            label.setMinimumWidth(380)
+            label.setFixedHeight(22)
+
+            # Statistics of the hot channel over the last STATS_WINDOW_S seconds
+            stats_label = QtWidgets.QLabel()
+            stats_label.setStyleSheet("font-family: Consolas; font-size: 9pt; color: gray;")
+            stats_label.setFixedHeight(16)
+
+            label.setProperty("base_style", label.styleSheet())
+
+            live_layout.addWidget(label)
+            live_layout.addWidget(stats_label)
+            self.live_labels[f"row{i}"] = label
+            self.live_labels[f"stats{i}"] = stats_label
+
+        control_layout.addWidget(live_box)
+
+        # -------- GLOBAL HOT/COLD TOGGLES ----------
+        global_box = QtWidgets.QGroupBox("Global Visibility")
+        gl = QtWidgets.QHBoxLayout(global_box)
+
+        self.cb_global_hot = QtWidgets.QCheckBox(f"Show All {HOT_LABEL}")
+        self.cb_global_hot.setChecked(True)
+        self.cb_global_hot.stateChanged.connect(self.toggle_all_hot)
+
+        self.cb_global_cold = QtWidgets.QCheckBox(f"Show All {COLD_LABEL}")
+        self.cb_global_cold.setChecked(True)
+        self.cb_global_cold.stateChanged.connect(self.toggle_all_cold)
+
+        gl.addWidget(self.cb_global_hot)
+        gl.addWidget(self.cb_global_cold)
+        control_layout.addWidget(global_box)
+
+        # -------- AXIS SCALING PANEL ----------
+        axis_box = QtWidgets.QGroupBox("Manual Axis Scaling")
+        axis_layout = QtWidgets.QGridLayout(axis_box)
+
+        axis_layout.addWidget(QtWidgets.QLabel("X Min:"), 0, 0)
+        self.xmin_edit = QtWidgets.QLineEdit()
+        if AXIS_X_MIN is not None:
+            self.xmin_edit.setText(str(AXIS_X_MIN))
+        self.xmin_edit.setPlaceholderText("auto")
+        axis_layout.addWidget(self.xmin_edit, 0, 1)
+
+        axis_layout.addWidget(QtWidgets.QLabel("X Max:"), 0, 2)
+        self.xmax_edit = QtWidgets.QLineEdit()
+        if AXIS_X_MAX is not None:
+            self.xmax_edit.setText(str(AXIS_X_MAX))
+        self.xmax_edit.setPlaceholderText("auto")
+        axis_layout.addWidget(self.xmax_edit, 0, 3)
+
+        axis_layout.addWidget(QtWidgets.QLabel("Y Min:"), 1, 0)
+        self.ymin_edit = QtWidgets.QLineEdit()
+        if AXIS_Y_MIN is not None:
+            self.ymin_edit.setText(str(AXIS_Y_MIN))
+        self.ymin_edit.setPlaceholderText("auto")
+        axis_layout.addWidget(self.ymin_edit, 1, 1)
+
+        axis_layout.addWidget(QtWidgets.QLabel("Y Max:"), 1, 2)
+        self.ymax_edit = QtWidgets.QLineEdit()
+        if AXIS_Y_MAX is not None:
+            self.ymax_edit.setText(str(AXIS_Y_MAX))
+        self.ymax_edit.setPlaceholderText("auto")
+        axis_layout.addWidget(self.ymax_edit, 1, 3)
+
+        apply_btn = QtWidgets.QPushButton("Apply Scaling")
+        apply_btn.clicked.connect(self.apply_manual_scaling)
+
+        auto_btn = QtWidgets.QPushButton("Auto Scale")
+        auto_btn.clicked.connect(self.reset_auto_scaling)
+
+        whole_btn = QtWidgets.QPushButton("Show Whole Run")
+        whole_btn.setEnabled(ARCHIVE_ENABLED)
+        whole_btn.clicked.connect(self.show_whole_run)
+
+        axis_layout.addWidget(apply_btn, 2, 0, 1, 2)
+        axis_layout.addWidget(auto_btn, 2, 2, 1, 2)
+        axis_layout.addWidget(whole_btn, 4, 0, 1, 4)
+
+        axis_layout.addWidget(QtWidgets.QLabel("History (s):"), 3, 0)
+        self.history_spin = QtWidgets.QSpinBox()
+        self.history_spin.setRange(1, 7 * 24 * 3600)
+        self.history_spin.setValue(int(self.history_seconds))
+        self.history_spin.valueChanged.connect(self.set_history_seconds)
+        axis_layout.addWidget(self.history_spin, 3, 1)
+
+        control_layout.addWidget(axis_box)
+
+        # -------- VIEW MODE BUTTONS ----------
+        btn_box = QtWidgets.QHBoxLayout()
+        self.btn_merged = QtWidgets.QPushButton("Merged View")
+        self.btn_split2 = QtWidgets.QPushButton("2-Column View")
+
+        self.btn_merged.clicked.connect(self.switch_to_merged)
+        self.btn_split2.clicked.connect(self.switch_to_split2)
+
+        btn_box.addWidget(self.btn_merged)
+        btn_box.addWidget(self.btn_split2)
+        control_layout.addLayout(btn_box)
+
+        # -------- SENSOR CHECKBOXES ----------
+        self.checkboxes = {}
+
+        for i in range(self.sensor_count):
+            group = QtWidgets.QGroupBox(f"{self.sensor_names[i]}")
+            hl = QtWidgets.QHBoxLayout(group)
+
+            key_hot = f"hot{i}"
+            key_cold = f"cold{i}"
+
+            cb_hot = QtWidgets.QCheckBox(HOT_LABEL)
+            cb_hot.setChecked(True)
+            cb_hot.toggled.connect(lambda chk, k=key_hot: self.on_curve_toggled(k, chk))
+            self.checkboxes[key_hot] = cb_hot
+
+            cb_cold = QtWidgets.QCheckBox(COLD_LABEL)
+            cb_cold.setChecked(True)
+            cb_cold.toggled.connect(lambda chk, k=key_cold: self.on_curve_toggled(k, chk))
+            self.checkboxes[key_cold] = cb_cold
+
+            hl.addWidget(cb_hot)
+            hl.addWidget(cb_cold)
+            control_layout.addWidget(group)
+
+        control_layout.addStretch()
+
+        # Scrolls when there are too many sensors (several boards) to fit
+        control_scroll = QtWidgets.QScrollArea()
+        control_scroll.setWidgetResizable(True)
+        control_scroll.setFrameShape(QtWidgets.QFrame.NoFrame)
+        control_scroll.setWidget(control_panel)
+        main_layout.addWidget(control_scroll, stretch=1)
+
+        # -------- STATUS BAR ----------
+        self.serial_status = QtWidgets.QLabel()
+        self.serial_status_time = 0.0
+        self.statusBar().addPermanentWidget(self.serial_status)
+
+        self.log_status = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self.log_status)
+
+        self.alarm_status = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self.alarm_status)
+
+        self.render_status = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self.render_status)
+
+        self.plot_pages = {}
+        self.page = None
+        self.show_plots()
+
+    # ---------- UNIT SWITCH ----------
+
+    def change_units(self, unit):
+        global TEMP_UNIT
+        TEMP_UNIT = unit
+
+        self.btn_unit_c.setChecked(unit == "C")
+        self.btn_unit_f.setChecked(unit == "F")
+
+        # Every page built so far, shown or not
+        for page in self.plot_pages.values():
+            for p in page.plot_widgets:
+                p.setLabel("left", f"{p.title} ({self.unit_suffix()})")
+
+        self.update_live_labels()
+        self.redraw.request()
+
+    def update_live_labels(self):
+        latest = self.data.last()
+        if latest is None:
+            return
+        self.live_refresh_time = time.monotonic()
+
+        scale, _ = self.unit_scale()
+        unit = self.unit_suffix()
+        snap = self.stats.snapshot()
+
+        for i in range(self.sensor_count):
+            hot = self.convert_temp(latest[self.columns[f"hot{i}"]])
+            cold = self.convert_temp(latest[self.columns[f"cold{i}"]])
+
+            self.live_labels[f"row{i}"].setText(
+                f"{self.sensor_names[i]}:  {HOT_LABEL} {hot:7.2f} {unit}   "
+                f"{COLD_LABEL} {cold:7.2f} {unit}"
+            )
+
+            c = self.columns[f"hot{i}"] - 1
+            self.live_labels[f"stats{i}"].setText(
+                f"    mean {self.convert_temp(snap['mean'][c]):7.2f}  std {snap['std'][c] * scale:5.2f}  "
+                f"min {self.convert_temp(snap['min'][c]):7.2f}  max {self.convert_temp(snap['max'][c]):7.2f}  "
+                f"{snap['slope'][c] * scale * 60:+6.2f} {unit}/min"
+            )
+
+    def live_stats(self):
+        # {channel name: {count, mean, std, min, max, slope}} over the last
+        # STATS_WINDOW_S seconds, in °C (slope in °C per second)
+        names = []
+        for name in self.sensor_names:
+            names += [f"{name}_{HOT_LABEL}", f"{name}_{COLD_LABEL}"]
+        return self.stats.summary(names)
+
+    # ---------- Alarms ----------
+
+    def show_alarms(self, events):
+        for e in events:
+            print(describe_alarm(e))
+        self.statusBar().showMessage(describe_alarm(events[-1]), 10000)
+
+        # Highlight the sensors with an alarm raised on either channel
+        raised = {}
+        for channel, kind in self.alarms.active_alarms():
+            raised.setdefault(channel.rsplit("_", 1)[0], []).append(f"{channel}: {kind}")
+
+        for i, name in enumerate(self.sensor_names):
+            label = self.live_labels[f"row{i}"]
+            style = label.property("base_style")
+            if name in raised:
+                style += " background-color: #ffd0d0; color: #b00000;"
+            label.setStyleSheet(style)
+            label.setToolTip("\n".join(raised.get(name, [])))
+
+    def update_alarm_status(self):
+        active = len(self.alarms.active_alarms())
+        text = f"Alarms: {active} active | check {self.alarms.last_eval_ms:.2f} ms"
+        latency = self.alarms.latency_stats()
+        if latency is not None:
+            text += f" | latency p50 {latency['p50_ms']:.0f} ms, p99 {latency['p99_ms']:.0f} ms"
+            if latency["over_budget"]:
+                text += f" ({latency['over_budget']} over {ALARM_LATENCY_BUDGET_MS} ms)"
+        self.alarm_status.setText(text)
+        self.alarm_status.setStyleSheet("color: #b00000;" if active else "")
+
+    # ---------- Plot Building ----------
+
+    def show_plots(self):
+        # Brings the current view mode's page to the front, building it the
+        # first time. Only the shown page is updated (see update_plot); its
+        # plotted_state tells what it missed while hidden.
+        page = self.plot_pages.get(self.view_mode)
+        if page is None:
+            page = PlotPage()
+            if self.view_mode == "merged":
+                self.build_merged(page)
+            else:
+                self.build_split2(page)
+            self.plot_stack.addWidget(page.widget)
+            self.plot_pages[self.view_mode] = page
+
+        self.page = page
+        self.plot_stack.setCurrentWidget(page.widget)
+        self.redraw.request()
+
+    def build_merged(self, page):
+        p = TimedPlotWidget(self.redraw, "Temperature")
+        p.addLegend()
+        p.setLabel("left", f"{p.title} ({self.unit_suffix()})")
+        p.setLabel("bottom", "Time (s)")
+
+        page.layout.addWidget(p, 0, 0)
+        page.plot_widgets.append(p)
+        self.watch_view(p)
+
+        for i in range(self.sensor_count):
+            for kind in ("hot", "cold"):
+                key = f"{kind}{i}"
+                color = self.curve_color(kind, i)
+                display_name = f"{self.sensor_names[i]} {HOT_LABEL if kind == 'hot' else COLD_LABEL}"
+                curve = p.plot([], [], pen=pg.mkPen(color=color, width=2), name=display_name)
+                curve.setVisible(self.checkboxes[key].isChecked())
+                page.curves_plot[key] = curve
+
+    def build_split2(self, page):
+        cfg = PLOT_LAYOUT["split2"]
+        if sorted(sum(cfg.values(), [])) != list(range(self.sensor_count)):
+            # Layout written for another sensor count: first half left, rest right
+            half = (self.sensor_count + 1) // 2
+            cfg = {"left": list(range(half)), "right": list(range(half, self.sensor_count))}
+
+        for col_idx, side in enumerate(cfg.keys()):
+            for row_idx, sensor in enumerate(cfg[side]):
+                p = TimedPlotWidget(self.redraw, f"{self.sensor_names[sensor]} Temp")
+                p.addLegend()
+                p.setLabel("left", f"{p.title} ({self.unit_suffix()})")
+                p.setLabel("bottom", "Time (s)")
+
+                page.layout.addWidget(p, row_idx, col_idx)
+                page.plot_widgets.append(p)
+                self.watch_view(p)
+
+                for kind in ("hot", "cold"):
+                    key = f"{kind}{sensor}"
+                    color = self.curve_color(kind, sensor)
+                    display_name = f"{self.sensor_names[sensor]} {HOT_LABEL if kind == 'hot' else COLD_LABEL}"
+                    curve = p.plot([], [], pen=pg.mkPen(color=color, width=2), name=display_name)
+                    curve.setVisible(self.checkboxes[key].isChecked())
+                    page.curves_plot[key] = curve
+
+    def watch_view(self, p):
+        # Panning, zooming and resizing change what has to be drawn
+        vb = p.getViewBox()
+        vb.sigRangeChangedManually.connect(self.redraw.request)
+        vb.sigResized.connect(self.redraw.request)
+
+    def curve_color(self, kind, sensor):
+        # CURVE_COLORS, or evenly spread hues for sensors it has no entry for
+        key = f"{kind}{sensor}"
+        if key in CURVE_COLORS:
+            return CURVE_COLORS[key]
+        return pg.intColor(2 * sensor + (kind == "cold"), 2 * self.sensor_count)
+
+    # ---------- View Toggles ----------
+
+    def switch_to_merged(self):
+        self.view_mode = "merged"
+        self.show_plots()
+
+    def switch_to_split2(self):
+        self.view_mode = "split2"
+        self.show_plots()
+
+    def on_curve_toggled(self, key, checked):
+        for page in self.plot_pages.values():
+            if key in page.curves_plot:
+                page.curves_plot[key].setVisible(checked)
+        if checked:
+            # Hidden curves are not kept up to date, so catch this one up now
+            self.redraw.request()
+
+    def toggle_all_hot(self, state):
+        show = (state == QtCore.Qt.Checked)
+        for i in range(self.sensor_count):
+            self.checkboxes[f"hot{i}"].setChecked(show)
+
+    def toggle_all_cold(self, state):
+        show = (state == QtCore.Qt.Checked)
+        for i in range(self.sensor_count):
+            self.checkboxes[f"cold{i}"].setChecked(show)
+
+    # ---------- MANUAL AXIS CONTROL ----------
+
+    def apply_manual_scaling(self):
+        global AXIS_X_MIN, AXIS_X_MAX, AXIS_Y_MIN, AXIS_Y_MAX
+
+        def parse_value(text):
+            text = text.strip()
+            if not text:
+                return None
+            try:
+                return float(text)
+            except ValueError:
+                return None
+
+        AXIS_X_MIN = parse_value(self.xmin_edit.text())
+        AXIS_X_MAX = parse_value(self.xmax_edit.text())
+        AXIS_Y_MIN = parse_value(self.ymin_edit.text())
+        AXIS_Y_MAX = parse_value(self.ymax_edit.text())
+
+        self.redraw.request()
+
+    def reset_auto_scaling(self):
+        global AXIS_X_MIN, AXIS_X_MAX, AXIS_Y_MIN, AXIS_Y_MAX
+        AXIS_X_MIN = AXIS_X_MAX = AXIS_Y_MIN = AXIS_Y_MAX = None
+
+        self.xmin_edit.clear()
+        self.xmax_edit.clear()
+        self.ymin_edit.clear()
+        self.ymax_edit.clear()
+
+        for page in self.plot_pages.values():
+            for p in page.plot_widgets:
+                p.enableAutoRange()
+            page.applied_ranges = None
+
+        self.redraw.request()
+
+    def show_whole_run(self):
+        # Zooms out to the start of the session; older parts come from the
+        # archive. Auto Scale goes back to following the live data.
+        last = self.data.last()
+        if last is None:
+            return
+        for p in self.page.plot_widgets:
+            p.setXRange(0, last[0], padding=0.02)
+        self.redraw.request()
+
+    def set_history_seconds(self, seconds):
+        # Only moves the start of the plotted window; older samples stay in
+        # the ring buffer, so widening the window shows them again
+        self.history_seconds = seconds
+        self.redraw.request()
+
+    # ---------- Serial Polling ----------
+
+    def poll_serial(self):
+        if self.reader is None:
+            self.check_connection()
+            return
+
+        stamps, values, arrived = self.reader.drain()
+
+        if len(stamps):
+            # Alarms first, so nothing else adds to their latency
+            events = self.alarms.evaluate(stamps, values, arrived)
+            if events:
+                self.alarm_log.write(events)
+                self.show_alarms(events)
+
+            block = np.empty((len(stamps), self.data.width))
+            block[:, 0] = np.round(stamps - self.start_time, 3)
+            block[:, 1:] = values
+            self.data.extend(block)
+            self.stats.update(block[:, 0], values)
+
+            # The log gets the same parsed floats in one array, no per-row lists
+            self.log.write(log_block(block[:, 0], stamps, values, self.logged))
+            if self.archive_log is not None:
+                self.archive_log.write(block)
+            if self.publisher is not None:
+                self.publisher.publish(stamps, values)
+
+            # Redrawn at a fixed rate, not on every batch
+            if time.monotonic() - self.live_refresh_time >= LIVE_REFRESH_MS / 1000:
+                self.update_live_labels()
+
+            # Only new data needs a redraw
+            self.redraw.request()
+
+        self.update_log_status()
+        self.update_serial_status()
+
+        if self.reader.error is not None:
+            print("Serial error:", self.reader.error)
+            self.timer.stop()
+
+    def update_log_status(self):
+        sink = self.log.sink
+        text = (
+            f"Log: {self.log.queue_depth} batches queued, {sink.pending_rows} rows buffered | "
+            f"flush {sink.last_flush_ms:.1f} ms (max {sink.max_flush_ms:.1f} ms)"
+        )
+        if self.log.dropped_rows:
+            text += f" | {self.log.dropped_rows} rows dropped"
+        if self.log.error is not None:
+            text += f" | WRITE ERROR: {self.log.error}"
+        self.log_status.setText(text)
+
+    def update_serial_status(self):
+        now = time.monotonic()
+        if now - self.serial_status_time < 1.0:
+            return
+        self.serial_status_time = now
+
+        r = self.reader.rates()
+        text = (
+            f"Serial ({self.reader.protocol}): {r['bytes_per_s']:.0f} B/s, {r['lines_per_s']:.1f} lines/s, "
+            f"{r['reads_per_s']:.1f} reads/s"
+        )
+        if self.reader.malformed:
+            text += f" | {self.reader.malformed} malformed lines"
+        if self.reader.missed_frames:
+            text += f" | {self.reader.missed_frames} frames missed"
+        self.serial_status.setText(text)
+        self.update_alarm_status()
+        self.update_render_status()
+
+    def update_render_status(self):
+        r = self.redraw.stats()
+        self.render_status.setText(
+            f"Plot: {r['fps']:.1f} fps (target {r['target_fps']:.0f}) | "
+            f"frame {r['frame_ms']:.1f} ms (max {r['max_frame_ms']:.1f} ms)"
+        )
+
+    # ---------- Plot Updating ----------
+
+    def update_plot(self):
+        if not len(self.data):
+            return
+
+        t = self.data.column(0)
+        start = self.data.search(t[-1] - self.history_seconds)
+        x, values, lod_key = self.plot_points(t, start)
+
+        # Nothing to redraw for a curve whose data, window and units are unchanged
+        state = (self.data.appended, start, TEMP_UNIT, lod_key)
+        page = self.page
+        stale = [
+            (key, curve) for key, curve in page.curves_plot.items()
+            if curve.isVisible() and page.plotted_state.get(key) != state
+        ]
+
+        if stale:
+            scale, offset = self.unit_scale()
+            if scale != 1.0 or offset != 0.0:
+                values = values * scale + offset
+
+            for key, curve in stale:
+                curve.setData(x, values[:, self.columns[key] - 1])
+                page.plotted_state[key] = state
+
+        ranges = (AXIS_X_MIN, AXIS_X_MAX, AXIS_Y_MIN, AXIS_Y_MAX)
+        if ranges != page.applied_ranges:
+            for p in page.plot_widgets:
+                if AXIS_X_MIN is not None and AXIS_X_MAX is not None:
+                    p.setXRange(AXIS_X_MIN, AXIS_X_MAX)
+                if AXIS_Y_MIN is not None and AXIS_Y_MAX is not None:
+                    p.setYRange(AXIS_Y_MIN, AXIS_Y_MAX)
+            page.applied_ranges = ranges
+
+    def plot_points(self, t, start):
+        # Raw samples while they fit on screen; past LOD_POINTS_PER_PIXEL per
+        # pixel column, per-pixel min/max envelopes so the cost of drawing
+        # depends on the plot width rather than on the history length
+        end = len(t)
+        older = None
+        view = self.visible_x_range()
+        if view is not None:
+            # Zoomed or manual X range: cover it plus one screen either side
+            # for panning, from any sample still in the ring buffer
+            span = view[1] - view[0]
+            lo, hi = view[0] - span, view[1] + span
+            start, end = self.data.search(lo), self.data.search(hi)
+            if self.archive is not None and lo < t[0]:
+                # Reaches back past the ring buffer: that part comes from the archive
+                older = (lo, min(hi, t[0]))
+        else:
+            span = t[-1] - t[start]
+
+        pixels = self.plot_pixels()
+        if start >= end:
+            x, y, key = np.empty(0), np.empty((0, self.data.width - 1)), None
+        elif end - start <= LOD_POINTS_PER_PIXEL * pixels or span <= 0:
+            x, y, key = t[start:end], self.data.view()[start:end, 1:], (start, end)
+        else:
+            x, y, key = self.lod.envelope(self.data, t[start], t[end - 1], span / pixels, pixels)
+
+        if older is not None:
+            ax, ay = self.archive.envelope(older[0], older[1], span / pixels)
+            x, y = np.concatenate((ax, x)), np.concatenate((ay, y))
+            key = (key, "archive", older, len(ax))
+        return x, y, key
+
+    def visible_x_range(self):
+        # None while the X axis follows the data
+        vb = self.page.plot_widgets[0].getViewBox()
+        if vb.autoRangeEnabled()[0]:
+            return None
+        return vb.viewRange()[0]
+
+    def plot_pixels(self):
+        width = max(int(p.getViewBox().width()) for p in self.page.plot_widgets)
+        return width if width > 0 else 1000
+
+    # ---------- Window State ----------
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.redraw.request()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QtCore.QEvent.WindowStateChange and not self.isMinimized():
+            # Catch up on what arrived while minimized
+            self.redraw.request()
+
+    # ---------- Cleanup + Exit Dialog ----------
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.redraw.stop()
+        self.connector.stop()
+        if SHARED_BUFFER_NAME:
+            self.data.close()
+
+        if self.reader is None:
+            # Never connected, so there is no log to report
+            self.connector.join(timeout=2)
+            self.connector.close()
+            event.accept()
+            return
+
+        self.reader.stop()
+        self.reader.join(timeout=2)
+        if self.publisher is not None:
+            self.publisher.close()
+        if self.reader.malformed:
+            print(f"Skipped {self.reader.malformed} malformed serial lines")
+
+        # Waits for every queued (and spilled) row to reach the file
+        try:
+            self.log.close()
+            self.alarm_log.close()
+            if self.archive_log is not None:
+                self.archive_log.close()
+        except:
+            pass
+
+        # NEW: show where the CSV was saved + allow opening folder
+        msg = QtWidgets.QMessageBox(self)
+        msg.setWindowTitle("Log Saved")
+        msg.setIcon(QtWidgets.QMessageBox.Information)
+        msg.setText(f"{LOG_FORMAT.upper()} log saved to:")
+        msg.setInformativeText(self.output_dir)
+
+        btn_open = msg.addButton("Open Folder", QtWidgets.QMessageBox.AcceptRole)
+        btn_exit = msg.addButton("Exit", QtWidgets.QMessageBox.RejectRole)
+
+        msg.exec_()
+
+        if msg.clickedButton() == btn_open:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(self.output_dir))
+
+        event.accept()
+
+
+def main(port=None, baud=BAUD):
+    app = QtWidgets.QApplication(sys.argv)
+
+    # NEW: prompt user to choose a COM port from a dropdown
+    # (not needed when DEVICES lists the boards)
+    selected_port = port
+    if selected_port is None and not DEVICES:
+        selected_port = choose_serial_port(default_port=PORT)
+        if not selected_port:
+            # user closed dialog or no ports found
+            sys.exit(0)
+
+    win = SerialPlotter(selected_port, baud)
+    win.resize(1500, 900)
+    win.show()
+    sys.exit(app.exec_())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+'''
+Logging without the GUI, for unattended machines.
+
+    python main.py --headless --port /dev/ttyACM0
+
+Only the serial reader and the log writer run; Qt and pyqtgraph are never
+imported. A status line is printed every STATUS_INTERVAL_S seconds. SIGINT
+(Ctrl+C) and SIGTERM (systemctl stop) flush the log before exiting. A lost
+serial connection ends the run with exit code 1, so a service manager can
+restart it (each run gets its own log folder). Alarms (ALARM_RULES) are
+printed as they happen and written to alarms.csv next to the log.
+'''
+import os
+import time
+import signal
+import threading
+
+import numpy as np
+import serial
+
+from config import *
+from alarms import AlarmEngine, AlarmLog, describe as describe_alarm
+from publish import start_publisher
+from sharedbuffer import SharedRingBuffer
+from devices import describe, sensor_names, session_devices, start_connector, start_reader
+from logsink import AsyncLogWriter, build_output_path, log_block, log_channels, log_columns, open_log_sink
+
+
+class HeadlessLogger:
+    def __init__(self, port, baud, duration=None, status_interval=STATUS_INTERVAL_S):
+        # One board on `port`, or every board in DEVICES when no port is given
+        self.devices = session_devices(port)
+        self.sensor_names = sensor_names(self.devices)
+        self.port = describe(self.devices)
+        self.baud = baud
+        self.duration = duration
+        self.status_interval = status_interval
+        self.alarms = AlarmEngine(log_columns(self.sensor_names, cold_junction=True)[2:])
+
+        self.reader = None
+        self.alarm_log = None
+        self.log = None
+        self.publisher = None
+        self.shared = None
+        self.rows = 0
+        self._stop_event = threading.Event()
+
+    def stop(self, *_):
+        self._stop_event.set()
+
+    def connect(self):
+        connector = start_connector(self.devices, self.baud)
+        while connector.is_alive():
+            if self._stop_event.wait(0.2):
+                connector.stop()
+        connector.join()
+        if connector.error is not None:
+            connector.close()
+            raise connector.error
+        return connector
+
+    def run(self):
+        print(f"Connecting to {self.port} at {self.baud} baud", flush=True)
+        try:
+            connector = self.connect()
+        except (serial.SerialException, OSError) as e:
+            print(f"Could not connect to {self.port}: {e}", flush=True)
+            return 1
+        if self._stop_event.is_set():
+            return 0
+
+        start_time = time.time()
+        output_file = build_output_path(sensor_count=len(self.sensor_names))
+        self.log = AsyncLogWriter(open_log_sink(output_file, log_columns(self.sensor_names)))
+        self.log.start()
+        logged = log_channels(len(self.sensor_names))
+        self.alarm_log = AlarmLog(os.path.join(os.path.dirname(output_file), "alarms.csv"), start_time)
+
+        if STREAM_ENABLED:
+            self.publisher = start_publisher(self.sensor_names)
+        if SHARED_BUFFER_NAME:
+            self.shared = SharedRingBuffer(HISTORY_CAPACITY, 1 + 2 * len(self.sensor_names), SHARED_BUFFER_NAME)
+            self.shared.epoch = start_time
+        self.reader = start_reader(self.devices, connector)
+
+        started = time.monotonic()
+        next_status = started + self.status_interval
+        exit_code = 0
+        try:
+            while not self._stop_event.wait(POLL_INTERVAL_MS / 1000):
+                self.write_pending(start_time, logged)
+
+                if self.reader.error is not None:
+                    print(f"Serial error: {self.reader.error}", flush=True)
+                    exit_code = 1
+                    break
+
+                now = time.monotonic()
+                if now >= next_status:
+                    self.print_status()
+                    next_status = now + self.status_interval
+                if self.duration is not None and now - started >= self.duration:
+                    break
+        finally:
+            self.reader.stop()
+            self.reader.join(timeout=2)
+            self.write_pending(start_time, logged)
+            if self.publisher is not None:
+                self.publisher.close()
+            if self.shared is not None:
+                self.shared.close()
+            self.log.close()
+            self.alarm_log.close()
+            self.print_status()
+            print(f"{LOG_FORMAT.upper()} log saved to: {output_file}", flush=True)
+        return exit_code
+
+    def write_pending(self, start_time, logged):
+        stamps, values, arrived = self.reader.drain()
+        if len(stamps):
+            # Alarms first, so logging does not add to their latency
+            events = self.alarms.evaluate(stamps, values, arrived)
+            if events:
+                self.alarm_log.write(events)
+                for e in events:
+                    print(describe_alarm(e), flush=True)
+
+            elapsed = np.round(stamps - start_time, 3)
+            self.log.write(log_block(elapsed, stamps, values, logged))
+            if self.publisher is not None:
+                self.publisher.publish(stamps, values)
+            if self.shared is not None:
+                self.shared.extend(np.column_stack((elapsed, values)))
+            self.rows += len(stamps)
+
+    def print_status(self):
+        r = self.reader.rates()
+        text = (
+            f"{self.rows} rows logged | {r['lines_per_s']:.1f} lines/s, {r['bytes_per_s']:.0f} B/s | "
+            f"{self.log.queue_depth} batches queued"
+        )
+        if self.reader.malformed:
+            text += f" | {self.reader.malformed} malformed lines"
+        if self.reader.missed_frames:
+            text += f" | {self.reader.missed_frames} frames missed"
+        if self.publisher is not None:
+            text += f" | {self.publisher.subscriber_count} stream subscribers"
+        active = self.alarms.active_alarms()
+        if active:
+            text += f" | {len(active)} alarms active"
+        latency = self.alarms.latency_stats()
+        if latency is not None:
+            text += f" | alarm latency p99 {latency['p99_ms']:.0f} ms"
+            if latency["over_budget"]:
+                text += f" ({latency['over_budget']} over {ALARM_LATENCY_BUDGET_MS} ms)"
+        if self.log.dropped_rows:
+            text += f" | {self.log.dropped_rows} rows dropped"
+        if self.log.error is not None:
+            text += f" | WRITE ERROR: {self.log.error}"
+        print(text, flush=True)
+
+
+def run(port=None, baud=BAUD, duration=None):
+    logger = HeadlessLogger(port, baud, duration)
+    signal.signal(signal.SIGINT, logger.stop)
+    signal.signal(signal.SIGTERM, logger.stop)
+    return logger.run()
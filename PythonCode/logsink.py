@@ -0,0 +1,463 @@
+import io
+import os
+import csv
+import sys
+import time
+import queue
+import pickle
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from config import *
+
+
+# Every sink takes rows of [time_since_start, epoch_seconds, channel values...]
+# and is told the column names up front. The CSV sink turns epoch_seconds into
+# the human readable "datetime" column; binary sinks keep the number.
+
+LOG_EXTENSIONS = {
+    "csv": ".csv",
+    "npy": ".npy",
+}
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+VALUE_DECIMALS = 2      # The firmware reads out in 0.01 °C steps
+
+
+# ---------------- BUFFERED SINK BASE ------------------
+
+class BufferedSink:
+    """
+    Collects rows in memory and writes them out in one go.
+
+    A flush happens once `flush_rows` rows or `flush_bytes` bytes are
+    pending, or `flush_interval` seconds have passed since the last one
+    (checked on every write and by poll()). With `fsync` each flush is also
+    forced to the disk, so a power cut loses at most one batch.
+    Subclasses implement _add(), _pending_bytes() and _write_pending().
+    """
+
+    def __init__(self, path, columns, flush_rows=LOG_FLUSH_ROWS, flush_bytes=LOG_FLUSH_BYTES,
+                 flush_interval=LOG_FLUSH_INTERVAL_S, fsync=LOG_FSYNC):
+        self.path = path
+        self.columns = list(columns)
+        self.flush_rows = flush_rows
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+        # Stats
+        self.rows_written = 0
+        self.flush_count = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @property
+    def pending_rows(self):
+        return self._pending
+
+    def writerows(self, rows):
+        self._add(rows)
+        self._pending += len(rows)
+        self.poll()
+
+    def poll(self):
+        if not self._pending:
+            return
+        if (self._pending >= self.flush_rows
+                or self._pending_bytes() >= self.flush_bytes
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        start = time.perf_counter()
+
+        self._write_pending()
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+        self.rows_written += self._pending
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+        self.flush_count += 1
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+
+    def stats(self):
+        return {
+            "rows_written": self.rows_written,
+            "pending_rows": self._pending,
+            "flush_count": self.flush_count,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+
+# ---------------- CSV SINK ------------------
+
+class BufferedCsvWriter(BufferedSink):
+    def __init__(self, path, columns, **kwargs):
+        super().__init__(path, columns, **kwargs)
+
+        self.file = open(path, "w", newline="")
+        self._buffer = io.StringIO()
+        self._last_second = None
+        self._last_label = None
+
+        csv.writer(self._buffer).writerow(self.columns)
+        self.flush()
+
+    def _add(self, rows):
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(self.columns))
+        when = self._datetimes(rows[:, 1])
+        # Readings keep the firmware's 0.01 °C steps; float32 frames would
+        # otherwise be written as e.g. 23.450000762939453
+        values = np.round(rows[:, 2:], VALUE_DECIMALS)
+
+        # One tolist() turns the whole batch into Python floats, whose repr is
+        # what csv.writer would have written for them
+        self._buffer.write("".join([
+            f"{t!r},{w},{','.join(map(repr, r))}\r\n"
+            for t, w, r in zip(rows[:, 0].tolist(), when, values.tolist())
+        ]))
+
+    def _datetimes(self, epochs):
+        # The datetime column only has whole seconds, so format each distinct
+        # second in the batch once instead of every row
+        seconds = np.floor(epochs).astype(np.int64)
+        unique, index = np.unique(seconds, return_inverse=True)
+        labels = [self._format_second(int(sec)) for sec in unique]
+        return [labels[k] for k in index]
+
+    def _format_second(self, second):
+        if second != self._last_second:
+            self._last_second = second
+            self._last_label = datetime.fromtimestamp(second).strftime(DATETIME_FORMAT)
+        return self._last_label
+
+    def _pending_bytes(self):
+        return self._buffer.tell()
+
+    def _write_pending(self):
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self.file.write(text)
+
+
+# ---------------- NPY SINK ------------------
+
+NPY_HEADER_BYTES = 4096
+
+
+def npy_dtype(columns):
+    return np.dtype([(name, "<f8") for name in columns])
+
+
+def npy_header(dtype, rows):
+    # The row count is padded to a fixed width so the header can be
+    # rewritten in place after every append
+    header = (
+        f"{{'descr': {np.lib.format.dtype_to_descr(dtype)!r}, "
+        f"'fortran_order': False, 'shape': ({rows:>20},), }}"
+    )
+    prefix = b"\x93NUMPY\x01\x00"
+    body_len = NPY_HEADER_BYTES - len(prefix) - 2
+    if len(header) + 1 > body_len:
+        raise ValueError("Too many log columns for the .npy header")
+    header = header.ljust(body_len - 1) + "\n"
+    return prefix + body_len.to_bytes(2, "little") + header.encode("latin1")
+
+
+class BufferedNpyWriter(BufferedSink):
+    """
+    Appendable binary log: one structured .npy array with a float64 field per
+    column (named like the CSV header; datetime is stored as epoch seconds).
+
+    Each flush appends a chunk of rows and rewrites the row count in the
+    header, so the file can be opened with np.load(path, mmap_mode="r") at any
+    time. read_npy_log() also recovers rows written after the last header
+    update if the program was killed mid-run.
+    """
+
+    def __init__(self, path, columns, **kwargs):
+        super().__init__(path, columns, **kwargs)
+
+        self.dtype = npy_dtype(self.columns)
+        self.file = open(path, "wb")
+        self.file.write(npy_header(self.dtype, 0))
+        self._chunks = []
+        self._total = 0
+
+    def _add(self, rows):
+        self._chunks.append(np.asarray(rows, dtype=np.float64).reshape(-1, len(self.columns)))
+
+    def _pending_bytes(self):
+        return self._pending * self.dtype.itemsize
+
+    def _write_pending(self):
+        if not self._chunks:
+            return
+        block = np.concatenate(self._chunks) if len(self._chunks) > 1 else self._chunks[0]
+        self._chunks = []
+
+        self.file.write(np.ascontiguousarray(block).tobytes())
+        self._total += len(block)
+
+        end = self.file.tell()
+        self.file.seek(0)
+        self.file.write(npy_header(self.dtype, self._total))
+        self.file.seek(end)
+
+
+def read_npy_log(path):
+    """Memory-map a .npy log, including rows past a stale header row count."""
+    with open(path, "rb") as f:
+        np.lib.format.read_magic(f)
+        _, _, dtype = np.lib.format.read_array_header_1_0(f)
+        offset = f.tell()
+    rows = (os.path.getsize(path) - offset) // dtype.itemsize
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(rows,))
+
+
+# ---------------- SINK FACTORY ------------------
+
+def open_log_sink(path, columns, log_format=LOG_FORMAT, **kwargs):
+    if log_format == "csv":
+        return BufferedCsvWriter(path, columns, **kwargs)
+    if log_format == "npy":
+        return BufferedNpyWriter(path, columns, **kwargs)
+    raise ValueError(f"Unknown LOG_FORMAT {log_format!r}, expected one of {tuple(LOG_EXTENSIONS)}")
+
+
+# ---------------- SESSION LOG LAYOUT ------------------
+
+# Shared by the GUI and the headless logger so both write identical files
+
+def build_output_path(root=ROOT_LOG_DIR, sensor_count=SENSOR_COUNT, log_format=LOG_FORMAT):
+    now = datetime.now()
+    date_folder = now.strftime("%Y-%m-%d")
+    time_folder = now.strftime("%H-%M-%S")
+
+    full_path = os.path.join(root, date_folder, time_folder)
+    os.makedirs(full_path, exist_ok=True)
+
+    filename = f"{EXPERIMENT_TYPE}_{sensor_count}ch{LOG_EXTENSIONS[log_format]}"
+    file_path = os.path.join(full_path, filename)
+
+    print(f"Saving logs to: {file_path}")
+    return file_path
+
+
+def log_columns(sensor_names, cold_junction=LOG_COLD_JUNCTION):
+    header = ["time_since_start", "datetime"]
+    for name in sensor_names:
+        header.append(f"{name}_{HOT_LABEL}")
+        if cold_junction:
+            header.append(f"{name}_{COLD_LABEL}")
+    return header
+
+
+def log_channels(sensor_count, cold_junction=LOG_COLD_JUNCTION):
+    # Indices into the Arduino's [hot0, cold0, hot1, cold1, ...] values
+    if cold_junction:
+        return np.arange(2 * sensor_count)
+    return np.arange(0, 2 * sensor_count, 2)
+
+
+def log_block(elapsed, stamps, values, channels):
+    # Rows of [time_since_start, epoch_seconds, logged channels...] in one array
+    block = np.empty((len(stamps), 2 + len(channels)))
+    block[:, 0] = elapsed
+    block[:, 1] = stamps
+    block[:, 2:] = values[:, channels]
+    return block
+
+
+# ---------------- CONVERSION + LOADING ------------------
+
+def npy_log_to_csv(src, dst=None, chunk_rows=100000):
+    """Rewrite a .npy log in the same layout the CSV sink produces."""
+    if dst is None:
+        dst = os.path.splitext(src)[0] + ".csv"
+
+    data = read_npy_log(src)
+    sink = BufferedCsvWriter(dst, data.dtype.names, flush_rows=chunk_rows,
+                             flush_bytes=float("inf"), flush_interval=float("inf"))
+    for start in range(0, len(data), chunk_rows):
+        chunk = data[start:start + chunk_rows]
+        sink.writerows(chunk.view(np.float64).reshape(len(chunk), -1))
+    sink.close()
+    return dst
+
+
+def load_log(path):
+    """Load a CSV or .npy log as a pandas DataFrame (requires pandas)."""
+    import pandas as pd
+
+    if path.endswith(LOG_EXTENSIONS["npy"]):
+        df = pd.DataFrame(np.asarray(read_npy_log(path)))
+        df["datetime"] = pd.to_datetime(df["datetime"], unit="s", utc=True)
+        df["datetime"] = df["datetime"].dt.tz_convert(datetime.now().astimezone().tzinfo).dt.tz_localize(None)
+        return df
+
+    return pd.read_csv(path, parse_dates=["datetime"])
+
+
+# ---------------- ASYNC LOG WRITER ------------------
+
+_STOP = object()
+
+
+class AsyncLogWriter(threading.Thread):
+    """
+    Runs a log sink on its own thread behind a bounded queue of row batches.
+
+    `overflow` decides what write() does when the queue is full:
+      "block"       - wait for room (the caller stalls, nothing is lost)
+      "drop_oldest" - discard the oldest queued batch
+      "spill"       - append to a temp file that is written out, in order,
+                      as soon as the queue has drained
+    close() queues a stop marker and waits until everything before it,
+    including spilled rows, has reached the sink.
+    """
+
+    POLICIES = ("block", "drop_oldest", "spill")
+
+    def __init__(self, sink, max_batches=LOG_QUEUE_BATCHES, overflow=LOG_OVERFLOW_POLICY):
+        if overflow not in self.POLICIES:
+            raise ValueError(f"Unknown log overflow policy {overflow!r}, expected one of {self.POLICIES}")
+
+        super().__init__(name="AsyncLogWriter", daemon=True)
+        self.sink = sink
+        self.overflow = overflow
+        self.queue = queue.Queue(maxsize=max_batches)
+
+        self.dropped_rows = 0
+        self.spilled_rows = 0
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._spill = None
+        self._spill_batches = 0
+
+    @property
+    def queue_depth(self):
+        return self.queue.qsize() + self._spill_batches
+
+    # ---------- Producer side ----------
+
+    def write(self, rows):
+        # rows: a list of rows or a 2-D array; it must not be modified afterwards
+        if not len(rows):
+            return
+
+        if self.overflow == "block":
+            self.queue.put(rows)
+            return
+
+        with self._lock:
+            # Once spilling, everything goes to the spill file until it has
+            # been written out, so rows stay in order
+            if self._spill_batches:
+                self._spill_write(rows)
+                return
+
+            try:
+                self.queue.put_nowait(rows)
+                return
+            except queue.Full:
+                pass
+
+            if self.overflow == "drop_oldest":
+                try:
+                    self.dropped_rows += len(self.queue.get_nowait())
+                except queue.Empty:
+                    pass
+                # Only the writer thread takes from the queue, so there is room now
+                self.queue.put_nowait(rows)
+            else:
+                self._spill_write(rows)
+
+    def _spill_write(self, rows):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix="thermolog_spill_")
+        pickle.dump(rows, self._spill, protocol=pickle.HIGHEST_PROTOCOL)
+        self._spill_batches += 1
+        self.spilled_rows += len(rows)
+
+    def close(self, timeout=None):
+        self.queue.put(_STOP)
+        self.join(timeout)
+
+    # ---------- Writer thread ----------
+
+    def run(self):
+        while True:
+            try:
+                rows = self.queue.get(timeout=0.25)
+            except queue.Empty:
+                self._drain_spill()
+                self._sink_call(self.sink.poll)
+                continue
+
+            if rows is _STOP:
+                self._drain_spill()
+                break
+
+            self._sink_call(self.sink.writerows, rows)
+            if self.queue.empty():
+                self._drain_spill()
+
+        self._sink_call(self.sink.close)
+        if self._spill is not None:
+            self._spill.close()
+
+    def _drain_spill(self):
+        with self._lock:
+            if not self._spill_batches or not self.queue.empty():
+                return
+            self._spill.seek(0)
+            batches = [pickle.load(self._spill) for _ in range(self._spill_batches)]
+            self._spill.seek(0)
+            self._spill.truncate()
+            self._spill_batches = 0
+
+        for rows in batches:
+            self._sink_call(self.sink.writerows, rows)
+
+    def _sink_call(self, fn, rows=None):
+        # Keep consuming after a disk error so producers never deadlock
+        try:
+            if rows is None:
+                fn()
+            else:
+                fn(rows)
+        except OSError as e:
+            if self.error is None:
+                print("Log write error:", e)
+            self.error = e
+            if rows is not None:
+                self.dropped_rows += len(rows)
+
+
+if __name__ == "__main__":
+    # python logsink.py <log.npy> [out.csv]
+    if len(sys.argv) not in (2, 3):
+        print("usage: python logsink.py <log.npy> [out.csv]")
+        sys.exit(2)
+    print("Wrote", npy_log_to_csv(*sys.argv[1:]))
@@ -0,0 +1,260 @@
+'''
+Live readings for other programs, without touching the serial port.
+
+With STREAM_ENABLED = True in config.py the GUI (or headless logger) serves
+every batch it reads on a local TCP port. Any number of scripts can
+subscribe:
+
+    from publish import StreamClient
+    with StreamClient() as stream:
+        print(stream.channels)                 # ["TC1_Hot", "TC1_Cold", ...]
+        for stamps, values in stream:          # arrays, as read from the Arduino
+            ...
+
+or, to watch from a terminal:
+
+    python publish.py [host:port]
+
+Each subscriber has its own bounded queue and sending thread. One that
+reads too slowly loses its oldest batches (and is told how many); it never
+holds up acquisition or the other subscribers.
+
+Wire format: messages of a 4-byte kind and a little-endian uint32 payload
+length, then the payload. The first message is HEAD (JSON: version,
+channel names); then DATA (float64 rows of [epoch seconds, values...]) and,
+after drops, LOST (uint64 number of batches lost).
+'''
+import os
+import sys
+import json
+import socket
+import struct
+import threading
+
+import numpy as np
+
+from config import *
+from logsink import log_columns
+from acquisition import DropOldestQueue
+
+
+PROTOCOL_VERSION = 1
+MESSAGE_HEADER = struct.Struct("<4sI")
+KIND_HEADER = b"HEAD"
+KIND_DATA = b"DATA"
+KIND_LOST = b"LOST"
+
+
+def encode_message(kind, payload):
+    return MESSAGE_HEADER.pack(kind, len(payload)) + payload
+
+
+def encode_batch(stamps, values):
+    rows = np.empty((len(stamps), 1 + values.shape[1]), dtype="<f8")
+    rows[:, 0] = stamps
+    rows[:, 1:] = values
+    return encode_message(KIND_DATA, rows.tobytes())
+
+
+# ---------------- PUBLISHER ------------------
+
+class _Subscriber(threading.Thread):
+    # One connected client: a bounded queue of encoded messages and a thread
+    # that sends them. Only this thread ever blocks on the socket.
+
+    def __init__(self, conn, address, header, max_batches):
+        super().__init__(name=f"StreamSubscriber {address}", daemon=True)
+        self.conn = conn
+        self.address = address
+        self.header = header
+        self.queue = DropOldestQueue(max_batches)
+        self._reported = 0
+
+    @property
+    def dropped_batches(self):
+        return self.queue.dropped
+
+    def offer(self, message):
+        # Never blocks: a full queue loses its oldest batch
+        self.queue.offer(message)
+
+    def close(self):
+        self.offer(None)
+
+    def run(self):
+        try:
+            self.conn.sendall(self.header)
+            while True:
+                message = self.queue.get()
+                if message is None:
+                    break
+                if self.dropped_batches != self._reported:
+                    lost = self.dropped_batches - self._reported
+                    self._reported = self.dropped_batches
+                    self.conn.sendall(encode_message(KIND_LOST, struct.pack("<Q", lost)))
+                self.conn.sendall(message)
+        except OSError:
+            pass   # Subscriber went away
+        finally:
+            self.conn.close()
+
+
+class LivePublisher(threading.Thread):
+    """
+    Serves batches to every subscriber of a local TCP port.
+
+    publish() encodes a batch once and offers it to each subscriber's queue;
+    it never waits for the network. `port=0` picks a free port (see
+    `address`).
+    """
+
+    def __init__(self, channels, host=STREAM_HOST, port=STREAM_PORT, max_batches=STREAM_QUEUE_BATCHES):
+        super().__init__(name="LivePublisher", daemon=True)
+        self.channels = list(channels)
+        self.max_batches = max_batches
+        self.header = encode_message(
+            KIND_HEADER, json.dumps({"version": PROTOCOL_VERSION, "channels": self.channels}).encode()
+        )
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if os.name != "nt":
+            # Lets a restarted logger take the port straight back; on Windows
+            # this option would let two loggers share it instead
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.server.bind((host, port))
+            self.server.listen()
+        except OSError:
+            self.server.close()
+            raise
+        self.server.settimeout(0.25)
+        self.address = self.server.getsockname()
+
+        self.subscribers = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return sum(s.is_alive() for s in self.subscribers)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                conn, address = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            subscriber = _Subscriber(conn, address, self.header, self.max_batches)
+            subscriber.start()
+            with self._lock:
+                self.subscribers = [s for s in self.subscribers if s.is_alive()] + [subscriber]
+
+    def publish(self, stamps, values):
+        if not len(stamps) or not self.subscribers:
+            return
+        message = encode_batch(stamps, values)
+        with self._lock:
+            for s in self.subscribers:
+                if s.is_alive():
+                    s.offer(message)
+
+    def close(self):
+        self._stop_event.set()
+        self.server.close()
+        with self._lock:
+            for s in self.subscribers:
+                s.close()
+
+
+def start_publisher(sensor_names, host=STREAM_HOST, port=STREAM_PORT):
+    # The session's publisher, or None if the port is taken: acquisition and
+    # logging carry on without the stream
+    try:
+        publisher = LivePublisher(log_columns(sensor_names, cold_junction=True)[2:], host, port)
+    except OSError as e:
+        print(f"Live stream not started on {host}:{port}: {e}")
+        return None
+    publisher.start()
+    print(f"Streaming live readings on {publisher.address[0]}:{publisher.address[1]}")
+    return publisher
+
+
+# ---------------- CLIENT ------------------
+
+class StreamClient:
+    """
+    Subscribes to a LivePublisher. Iterating yields (stamps, values) arrays
+    per batch until the publisher stops; `lost_batches` counts batches the
+    publisher dropped because this client fell behind.
+    """
+
+    def __init__(self, host=STREAM_HOST, port=STREAM_PORT, timeout=10.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.settimeout(None)
+        self._file = self.sock.makefile("rb")
+        self.lost_batches = 0
+
+        kind, payload = self._read_message()
+        if kind != KIND_HEADER:
+            raise ConnectionError(f"{host}:{port} is not a thermocouple stream")
+        header = json.loads(payload)
+        if header.get("version") != PROTOCOL_VERSION:
+            raise ConnectionError(f"Unsupported stream version {header.get('version')}")
+        self.channels = header["channels"]
+
+    def _read_exact(self, size):
+        data = self._file.read(size)
+        if len(data) < size:
+            raise EOFError
+        return data
+
+    def _read_message(self):
+        kind, length = MESSAGE_HEADER.unpack(self._read_exact(MESSAGE_HEADER.size))
+        return kind, self._read_exact(length)
+
+    def __iter__(self):
+        width = 1 + len(self.channels)
+        while True:
+            try:
+                kind, payload = self._read_message()
+            except (EOFError, OSError):
+                return
+            if kind == KIND_DATA:
+                rows = np.frombuffer(payload, dtype="<f8").reshape(-1, width)
+                yield rows[:, 0], rows[:, 1:]
+            elif kind == KIND_LOST:
+                self.lost_batches += struct.unpack("<Q", payload)[0]
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv):
+    host, port = STREAM_HOST, STREAM_PORT
+    if argv:
+        host, _, port = argv[0].rpartition(":")
+        host, port = host or STREAM_HOST, int(port)
+
+    with StreamClient(host, port) as stream:
+        print(f"Connected to {host}:{port}, {len(stream.channels)} channels")
+        rows = 0
+        for stamps, values in stream:
+            rows += len(stamps)
+            latest = ", ".join(f"{name} {v:.2f}" for name, v in zip(stream.channels, values[-1]))
+            print(f"{rows} rows ({stream.lost_batches} batches lost) | {latest}", flush=True)
+    print("Stream ended")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+# ---------------- RING BUFFER ------------------
+
+class RingBuffer:
+    """
+    Fixed-capacity table of float64 rows backed by one contiguous array.
+
+    Rows are appended into a little spare room past `capacity`; when that
+    runs out the newest rows are moved back to the front in one copy. Appends
+    are therefore O(1) amortised and the live rows are always a single slice
+    of the backing array, so `view()` never copies.
+    """
+
+    def __init__(self, capacity, width, slack=None):
+        if slack is None:
+            slack = max(1, capacity // 4)
+
+        self.capacity = capacity
+        self.width = width
+        self._data = self._allocate(capacity + slack, width)
+        self._start = 0
+        self._end = 0
+
+        # Total rows ever appended; lets readers tell whether anything changed
+        self.appended = 0
+
+    def _allocate(self, rows, width):
+        return np.empty((rows, width), dtype=np.float64)
+
+    def __len__(self):
+        return self._end - self._start
+
+    def _make_room(self, n):
+        if self._end + n <= len(self._data):
+            return
+        keep = min(len(self), self.capacity - n)
+        self._data[:keep] = self._data[self._end - keep:self._end]
+        self._start, self._end = 0, keep
+
+    def append(self, row):
+        self._make_room(1)
+        self._data[self._end] = row
+        self._end += 1
+        self.appended += 1
+        if len(self) > self.capacity:
+            self._start += 1
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, self.width)
+        if len(rows) > self.capacity:
+            rows = rows[-self.capacity:]
+
+        n = len(rows)
+        self._make_room(n)
+        self._data[self._end:self._end + n] = rows
+        self._end += n
+        self.appended += n
+        if len(self) > self.capacity:
+            self._start = self._end - self.capacity
+
+    def popleft(self, n=1):
+        self._start = min(self._start + n, self._end)
+
+    def pop(self, n=1):
+        # Drops the newest rows (`appended` still counts them)
+        self._end = max(self._end - n, self._start)
+
+    def clear(self):
+        self._start = self._end = 0
+
+    def view(self):
+        return self._data[self._start:self._end]
+
+    def column(self, index):
+        return self._data[self._start:self._end, index]
+
+    def search(self, value, column=0):
+        # Index into view() of the first row with row[column] >= value.
+        # Binary search, so the column must be non-decreasing (e.g. time).
+        return int(np.searchsorted(self.column(column), value, side="left"))
+
+    def last(self):
+        if self._end == self._start:
+            return None
+        return self._data[self._end - 1]
@@ -0,0 +1,206 @@
+'''
+The plot's ring buffer in shared memory, for other processes on this PC.
+
+With SHARED_BUFFER_NAME set in config.py, the GUI keeps its plot history
+(rows of [time, hot0, cold0, hot1, cold1, ...], time in seconds since the
+session started) in a named shared memory block instead of private memory.
+A process such as a control loop can then read the newest readings in
+microseconds, with no socket, no serialisation and no copy beyond the rows it
+asks for:
+
+    from sharedbuffer import SharedRingReader
+    buf = SharedRingReader("thermolog")
+    appended, row = buf.latest()       # newest row, and how many rows so far
+    rows = buf.snapshot(100)           # newest 100 rows
+    buf.epoch + row[0]                 # wall-clock time of that row
+
+Consistency comes from a seqlock in the block's header: the writer makes the
+sequence number odd before it touches the rows and even again afterwards, and
+a reader retries until it sees the same even number before and after its copy.
+Readers never block the writer. This relies on the CPU making stores visible
+in program order, which x86-64 PCs do.
+'''
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config import *
+from ringbuffer import RingBuffer
+
+
+MAGIC = 0x54484D4C4F47     # "THMLOG"
+VERSION = 1
+HEADER_BYTES = 128
+
+# int64 header fields
+H_MAGIC, H_VERSION, H_SEQ, H_START, H_END, H_APPENDED, H_ROWS, H_WIDTH, H_CAPACITY, H_EPOCH_US = range(10)
+
+# Blocks created by a SharedRingBuffer in this process
+_owned = set()
+
+
+def _attach(name):
+    # Readers must not let Python's resource tracker delete the block when
+    # they exit; only the writer owns it. Before Python 3.13 that means
+    # taking the block off the tracker's list, unless this process is the
+    # writer, whose entry must stay for its own unlink()
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name != "nt" and name not in _owned:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+# ---------------- WRITER ------------------
+
+class SharedRingBuffer(RingBuffer):
+    """
+    RingBuffer whose rows live in a named shared memory block. Every change
+    is bracketed by the seqlock and ends by publishing the live range in the
+    header. close() removes the block.
+    """
+
+    def __init__(self, capacity, width, name, slack=None):
+        self.name = name
+        super().__init__(capacity, width, slack)
+        self._header[H_MAGIC] = MAGIC
+        self._header[H_VERSION] = VERSION
+        self._header[H_CAPACITY] = capacity
+        self._publish()
+
+    def _allocate(self, rows, width):
+        size = HEADER_BYTES + rows * width * 8
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a session that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        _owned.add(self.name)
+
+        self._header = np.ndarray((HEADER_BYTES // 8,), dtype=np.int64, buffer=self.shm.buf)
+        self._header[:] = 0
+        self._header[H_ROWS] = rows
+        self._header[H_WIDTH] = width
+        return np.ndarray((rows, width), dtype=np.float64, buffer=self.shm.buf, offset=HEADER_BYTES)
+
+    @property
+    def epoch(self):
+        return self._header[H_EPOCH_US] / 1e6
+
+    @epoch.setter
+    def epoch(self, seconds):
+        # Wall-clock time that the time column counts from
+        self._header[H_EPOCH_US] = round(seconds * 1e6)
+
+    def _begin(self):
+        self._header[H_SEQ] += 1
+
+    def _publish(self):
+        self._header[H_START] = self._start
+        self._header[H_END] = self._end
+        self._header[H_APPENDED] = self.appended
+        if self._header[H_SEQ] % 2:
+            self._header[H_SEQ] += 1
+
+    def append(self, row):
+        self._begin()
+        super().append(row)
+        self._publish()
+
+    def extend(self, rows):
+        self._begin()
+        super().extend(rows)
+        self._publish()
+
+    def popleft(self, n=1):
+        self._begin()
+        super().popleft(n)
+        self._publish()
+
+    def pop(self, n=1):
+        self._begin()
+        super().pop(n)
+        self._publish()
+
+    def clear(self):
+        self._begin()
+        super().clear()
+        self._publish()
+
+    def close(self):
+        self.shm.unlink()
+        _owned.discard(self.name)
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # Views of the rows are still in use; freed with them
+
+
+# ---------------- READER ------------------
+
+class SharedRingReader:
+    """
+    Read-only view of a SharedRingBuffer from any process. latest() and
+    snapshot() return consistent copies; `appended` (total rows ever
+    written) tells whether anything new has arrived.
+    """
+
+    def __init__(self, name=SHARED_BUFFER_NAME):
+        self.shm = _attach(name)
+        self._header = np.ndarray((HEADER_BYTES // 8,), dtype=np.int64, buffer=self.shm.buf)
+        if self._header[H_MAGIC] != MAGIC or self._header[H_VERSION] != VERSION:
+            self.close()
+            raise ValueError(f"Shared memory block {name!r} is not a thermocouple buffer")
+
+        self.width = int(self._header[H_WIDTH])
+        self.capacity = int(self._header[H_CAPACITY])
+        rows = int(self._header[H_ROWS])
+        self._data = np.ndarray((rows, self.width), dtype=np.float64, buffer=self.shm.buf, offset=HEADER_BYTES)
+
+    @property
+    def epoch(self):
+        return self._header[H_EPOCH_US] / 1e6
+
+    @property
+    def appended(self):
+        return int(self._header[H_APPENDED])
+
+    def _read(self, copy_rows):
+        # Seqlock read: retry until no write overlapped the copy
+        header = self._header
+        tries = 0
+        while True:
+            seq = header[H_SEQ]
+            if seq % 2 == 0:
+                start, end, appended = int(header[H_START]), int(header[H_END]), int(header[H_APPENDED])
+                result = copy_rows(start, end)
+                if header[H_SEQ] == seq:
+                    return appended, result
+            tries += 1
+            if tries % 100 == 0:
+                time.sleep(0)
+
+    def latest(self):
+        # (appended, newest row) or None while the buffer is empty
+        appended, row = self._read(lambda start, end: self._data[end - 1].copy() if end > start else None)
+        return None if row is None else (appended, row)
+
+    def snapshot(self, n=None):
+        # Newest n rows (all rows if n is None), oldest first
+        def copy_rows(start, end):
+            if n is not None:
+                start = max(start, end - n)
+            return self._data[start:end].copy()
+        return self._read(copy_rows)[1]
+
+    def close(self):
+        self._header = self._data = None
+        self.shm.close()
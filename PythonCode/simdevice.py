@@ -0,0 +1,324 @@
+'''
+A software Arduino for running the logger without hardware.
+
+    sim://?rate=1000&sensors=8          generated readings, 1000 per second
+    replay://DataLog/.../run.csv        a recorded log, at its original pace
+    replay://run.npy?speed=10&loop=1    ten times faster, starting over at the end
+
+Either URL can be used anywhere a port name is accepted (PORT in config.py,
+the port dialog, open_serial). The device behaves like main.ino: it prints a
+banner and READY when opened or reset through DTR, sends "millis,seq,values"
+lines, and answers BIN1 / BIN2 / TEXT with the same binary frames.
+
+Options (all optional):
+    rate=<Hz>       samples per second (sim: default 10, replay: overrides the
+                    recorded timing)
+    sensors=<n>     sensor count for sim:// (default SENSOR_COUNT)
+    seed=<n>        random seed for sim://, so runs are repeatable
+    speed=<x>       replay speed-up when no rate is given (default 1)
+    loop=1          replay from the start again after the last row
+    boot=<s>        delay before READY, like the real setup() (default 0)
+    buffer=<bytes>  receive buffer size; samples that do not fit are lost,
+                    as on a real UART overrun (default 1 MiB)
+
+The link is not limited to the baud rate, so rates well beyond what 115200
+baud can carry are possible for load testing.
+'''
+import csv
+import time
+import threading
+import binascii
+from urllib.parse import parse_qs
+
+import numpy as np
+import serial
+from serial.serialutil import SerialBase, PortNotOpenError
+
+from config import *
+
+
+SIM_SCHEMES = ("sim", "replay")
+
+
+def is_simulated(port):
+    return isinstance(port, str) and port.split("://", 1)[0] in SIM_SCHEMES and "://" in port
+
+
+def load_replay(path):
+    # Returns (seconds since start, values) from a CSV or .npy log, with the
+    # values in the Arduino's [hot0, cold0, hot1, cold1, ...] order. Logs made
+    # without cold-junction columns replay those channels as nan.
+    if path.endswith(".npy"):
+        from logsink import read_npy_log
+        log = read_npy_log(path)
+        names = list(log.dtype.names)
+        table = {name: np.asarray(log[name], dtype=np.float64) for name in names}
+    else:
+        with open(path, newline="") as f:
+            names = next(csv.reader(f))
+        columns = [k for k, name in enumerate(names) if name != "datetime"]
+        raw = np.loadtxt(path, delimiter=",", skiprows=1, usecols=columns, ndmin=2)
+        table = {names[k]: raw[:, j] for j, k in enumerate(columns)}
+
+    hot = [name for name in names if name.endswith(f"_{HOT_LABEL}")]
+    if "time_since_start" not in table or not hot:
+        raise ValueError(f"{path} does not look like a thermocouple log")
+
+    times = table["time_since_start"]
+    values = np.full((len(times), 2 * len(hot)), np.nan)
+    for i, name in enumerate(hot):
+        values[:, 2 * i] = table[name]
+        cold = name[:-len(HOT_LABEL)] + COLD_LABEL
+        if cold in table:
+            values[:, 2 * i + 1] = table[cold]
+    return times - times[0], values
+
+
+class SimulatedArduino(SerialBase):
+    """
+    pyserial-compatible port backed by a generator or a recorded log.
+
+    Nothing runs in the background: whenever the port is read, the samples
+    that have fallen due since the last read are produced in one batch, so
+    the stream keeps its rate even when the reader is slow to come back.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._lock = threading.Lock()
+        self._out = bytearray()
+        self._cmd = bytearray()
+        super().__init__(*args, **kwargs)
+
+    # ---------- pyserial plumbing ----------
+
+    def open(self):
+        if self.is_open:
+            raise serial.SerialException("Port is already open.")
+        if self._port is None:
+            raise serial.SerialException("Port must be configured before it can be used.")
+        self.from_url(self._port)
+        self.is_open = True
+        self._boot()
+
+    def close(self):
+        self.is_open = False
+        super().close()
+
+    def from_url(self, url):
+        scheme, _, rest = url.partition("://")
+        path, _, query = rest.partition("?")
+        opts = {key: values[-1] for key, values in parse_qs(query).items()}
+        try:
+            self.rate = float(opts["rate"]) if "rate" in opts else None
+            self.speed = float(opts.get("speed", 1))
+            self.loop = opts.get("loop", "0") not in ("0", "false", "")
+            self.boot_delay = float(opts.get("boot", 0))
+            self.buffer_size = int(opts.get("buffer", 1 << 20))
+            seed = int(opts["seed"]) if "seed" in opts else None
+            sensors = int(opts.get("sensors", SENSOR_COUNT))
+
+            if scheme == "replay":
+                self.times, self.table = load_replay(path)
+                if self.rate is not None:
+                    self.times = np.arange(len(self.table)) / self.rate
+                else:
+                    self.times = self.times / self.speed
+                # A lap lasts one sample interval longer than the recording
+                step = self.times[1] if len(self.times) > 1 else 1.0
+                self.period = self.times[-1] + step
+                self.value_count = self.table.shape[1]
+            else:
+                self.table = None
+                self.rate = self.rate or 10.0
+                self.value_count = 2 * sensors
+                self.rng = np.random.default_rng(seed)
+        except (OSError, ValueError, KeyError) as e:
+            raise serial.SerialException(f"Could not open {url}: {e}")
+
+        self.fmt = "%d,%d," + ",".join(["%.2f"] * self.value_count) + "\r\n"
+        self.frame_types = {}
+
+    def _reconfigure_port(self):
+        pass
+
+    def _update_rts_state(self):
+        pass
+
+    def _update_break_state(self):
+        pass
+
+    def _update_dtr_state(self):
+        # Like the auto-reset circuit: DTR going high restarts the sketch
+        rising = self._dtr_state and not getattr(self, "_last_dtr", True)
+        self._last_dtr = self._dtr_state
+        if rising and self.is_open:
+            self._boot()
+
+    def reset_input_buffer(self):
+        with self._lock:
+            self._out.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    # ---------- Device ----------
+
+    def _boot(self):
+        with self._lock:
+            self.mode = "text"
+            self.booted = time.monotonic() + self.boot_delay
+            self.sent = 0
+            self.overrun = 0
+            self._out.clear()
+            self._out += b"Simulated Arduino\r\n"
+            self._ready_sent = False
+
+    def _due(self, elapsed):
+        # Number of samples whose time has come, counting from boot
+        if self.table is None:
+            return int(elapsed * self.rate) + 1
+        if self.loop:
+            laps, rem = divmod(elapsed, self.period)
+            return int(laps) * len(self.times) + int(np.searchsorted(self.times, rem, side="right"))
+        return int(np.searchsorted(self.times, elapsed, side="right"))
+
+    def _samples(self, first, n):
+        # millis and values for samples first .. first + n - 1
+        k = np.arange(first, first + n)
+        if self.table is None:
+            t = k / self.rate
+            sensor = np.arange(self.value_count) // 2
+            base = np.where(np.arange(self.value_count) % 2 == 0, 25.0 + 5.0 * sensor, 22.0)
+            swing = np.where(np.arange(self.value_count) % 2 == 0, 3.0, 0.5)
+            values = base + swing * np.sin(2 * np.pi * t[:, None] / 60.0 + sensor)
+            values += self.rng.normal(0.0, 0.05, size=values.shape)
+            values = np.round(values, 2)
+        else:
+            rows = k % len(self.table)
+            t = self.times[rows] + (k // len(self.table)) * self.period
+            values = self.table[rows]
+        millis = (t * 1000).astype(np.int64) % (1 << 32)
+        return millis, values
+
+    def _encode(self, first, millis, values):
+        seq = np.arange(first, first + len(values)) % 65536
+        if self.mode == "text":
+            return "".join(
+                self.fmt % (ms, s, *row) for ms, s, row in zip(millis.tolist(), seq.tolist(), values.tolist())
+            ).encode()
+
+        from acquisition import FRAME_ENCODINGS, FRAME_SYNC, INT16_NAN, frame_dtype
+        if self.mode not in self.frame_types:
+            self.frame_types[self.mode] = frame_dtype(self.mode, self.value_count)
+        frames = np.zeros(len(values), dtype=self.frame_types[self.mode])
+        frames["sync"] = int.from_bytes(FRAME_SYNC, "little")
+        frames["enc"] = FRAME_ENCODINGS[self.mode]
+        frames["seq"] = seq
+        frames["millis"] = millis
+        frames["count"] = self.value_count
+        if self.mode == "float32":
+            frames["values"] = values
+        else:
+            ok = np.isfinite(values) & (np.abs(values) < 327.67)
+            frames["values"] = np.where(ok, np.round(np.where(ok, values, 0) * 100), INT16_NAN)
+
+        raw = bytearray(frames.tobytes())
+        size = frames.dtype.itemsize
+        for k in range(len(frames)):
+            start = k * size
+            crc = binascii.crc_hqx(raw[start + 2:start + size - 2], 0xFFFF)
+            raw[start + size - 2:start + size] = crc.to_bytes(2, "little")
+        return bytes(raw)
+
+    def _pump(self):
+        # Produce everything that has fallen due; caller holds the lock
+        elapsed = time.monotonic() - self.booted
+        if elapsed < 0:
+            return
+        if not self._ready_sent:
+            self._out += b"READY\r\n"
+            self._ready_sent = True
+
+        n = self._due(elapsed) - self.sent
+        if n <= 0:
+            return
+        millis, values = self._samples(self.sent, n)
+        data = self._encode(self.sent, millis, values)
+        self.sent += n
+
+        room = max(self.buffer_size - len(self._out), 0)
+        if len(data) > room:
+            # UART overrun: the samples that do not fit are lost
+            if self.mode == "text":
+                data = data[:data.rfind(b"\n", 0, room) + 1]
+                self.overrun += n - data.count(b"\n")
+            else:
+                keep = room // (len(data) // n)
+                data = data[:keep * (len(data) // n)]
+                self.overrun += n - keep
+        self._out += data
+
+    def _next_due(self):
+        # Seconds until the next sample, capped so reads stay responsive
+        elapsed = time.monotonic() - self.booted
+        if elapsed < 0:
+            return min(-elapsed, 0.05)
+        if self.table is None:
+            return min((self.sent / self.rate) - elapsed, 0.05)
+        if self.loop or self.sent < len(self.times):
+            lap, k = divmod(self.sent, len(self.times))
+            return min(self.times[k] + lap * self.period - elapsed, 0.05)
+        return 0.05
+
+    # ---------- pyserial API ----------
+
+    @property
+    def in_waiting(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        with self._lock:
+            self._pump()
+            return len(self._out)
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise PortNotOpenError()
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        while True:
+            with self._lock:
+                self._pump()
+                if self._out or self._timeout == 0:
+                    data = bytes(self._out[:size])
+                    del self._out[:size]
+                    return data
+                wait = self._next_due()
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_open:
+                    return b""
+                wait = min(wait, remaining)
+            time.sleep(max(wait, 0.0005))
+
+    def write(self, data):
+        if not self.is_open:
+            raise PortNotOpenError()
+        with self._lock:
+            # Samples already due went out in the old mode
+            self._pump()
+            self._cmd += data
+            while True:
+                end = min((k for k in (self._cmd.find(b"\n"), self._cmd.find(b"\r")) if k >= 0), default=-1)
+                if end < 0:
+                    break
+                cmd = bytes(self._cmd[:end]).strip()
+                del self._cmd[:end + 1]
+                if cmd == b"BIN1":
+                    self._out += b"BINARY OK\r\n"
+                    self.mode = "float32"
+                elif cmd == b"BIN2":
+                    self._out += b"BINARY OK\r\n"
+                    self.mode = "int16"
+                elif cmd == b"TEXT":
+                    self.mode = "text"
+                    self._out += b"TEXT OK\r\n"
+        return len(data)
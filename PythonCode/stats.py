@@ -0,0 +1,159 @@
+from collections import deque
+
+import numpy as np
+
+from config import *
+
+
+# ---------------- ROLLING STATISTICS ------------------
+
+def _block_moments(x):
+    # Per-channel count, mean and sum of squared deviations, ignoring nan
+    n = np.count_nonzero(~np.isnan(x), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(x, axis=0) / n
+    m2 = np.nansum((x - mean) ** 2, axis=0)
+    return n, np.where(n > 0, mean, 0.0), m2
+
+
+class RollingStats:
+    """
+    Per-channel statistics over the last `window` seconds: count, mean,
+    standard deviation, min, max and slope (least-squares rate of change, in
+    units per second).
+
+    Rows come in blocks, as drained from the reader. Mean and variance are
+    kept as Welford moments: each block's moments are merged in, and expired
+    rows are taken back out again with Chan's formula. Min and max come from
+    monotonic deques, and the slope from running sums. An update therefore
+    costs time in proportion to the rows added and expired, however long the
+    window is. Every `window` seconds the sums are rebuilt from the rows in
+    the window, so rounding errors cannot build up over a long run. nan
+    readings are skipped.
+    """
+
+    def __init__(self, channels, window=STATS_WINDOW_S):
+        self.channels = channels
+        self.window = window
+
+        self._blocks = deque()   # (times, values) blocks still in the window
+        self._mins = [deque() for _ in range(channels)]   # (time, value), values increasing
+        self._maxs = [deque() for _ in range(channels)]   # (time, -value), likewise
+        self._reset(None)
+
+    def _reset(self, origin):
+        zeros = np.zeros(self.channels)
+        self._n, self._mean, self._m2 = zeros.copy(), zeros.copy(), zeros.copy()
+        # Slope sums, with times relative to `_origin` to keep them small
+        self._origin = origin
+        self._st, self._stt, self._stx = zeros.copy(), zeros.copy(), zeros.copy()
+
+    # ---------- Updating ----------
+
+    def update(self, times, values):
+        if not len(times):
+            return
+        if self._origin is None:
+            self._origin = times[0]
+
+        self._blocks.append((times, values))
+        self._add(times, values, 1)
+        for c in range(self.channels):
+            self._push(self._mins[c], times, values[:, c])
+            self._push(self._maxs[c], times, -values[:, c])
+
+        cutoff = times[-1] - self.window
+        self._expire(cutoff)
+        if cutoff > self._origin:
+            self._rebuild()
+
+    def _add(self, times, values, sign):
+        n, mean, m2 = _block_moments(values)
+        if sign < 0:
+            n = -n
+
+        # Chan et al.: merge (or, with a negative count, split off) a block
+        total = self._n + n
+        safe = np.where(total > 0, total, 1)
+        delta = mean - self._mean
+        new_mean = self._mean + delta * n / safe
+        self._m2 = np.where(total > 0, self._m2 + sign * m2 + delta ** 2 * self._n * n / safe, 0.0)
+        self._mean = np.where(total > 0, new_mean, 0.0)
+        self._n = total
+
+        t = (times - self._origin)[:, None]
+        valid = ~np.isnan(values)
+        self._st += sign * np.sum(np.where(valid, t, 0.0), axis=0)
+        self._stt += sign * np.sum(np.where(valid, t * t, 0.0), axis=0)
+        self._stx += sign * np.nansum(t * values, axis=0)
+
+    def _expire(self, cutoff):
+        while self._blocks and self._blocks[0][0][0] < cutoff:
+            times, values = self._blocks[0]
+            k = int(np.searchsorted(times, cutoff, side="left"))
+            self._add(times[:k], values[:k], -1)
+            if k == len(times):
+                self._blocks.popleft()
+            else:
+                self._blocks[0] = (times[k:], values[k:])
+
+        for dq in self._mins + self._maxs:
+            while dq and dq[0][0] < cutoff:
+                dq.popleft()
+
+    def _rebuild(self):
+        if not self._blocks:
+            self._reset(None)
+            return
+        times = np.concatenate([b[0] for b in self._blocks])
+        values = np.concatenate([b[1] for b in self._blocks])
+        self._blocks = deque([(times, values)])
+        self._reset(times[-1])
+        self._add(times, values, 1)
+
+    @staticmethod
+    def _push(dq, times, x):
+        # Monotonic deque for the window minimum of x. Only readings smaller
+        # than everything after them can ever be the minimum; in a block those
+        # are the points where x undercuts its own suffix minimum.
+        valid = ~np.isnan(x)
+        if not valid.any():
+            return
+        t, x = times[valid], x[valid]
+        after = np.append(np.minimum.accumulate(x[::-1])[::-1][1:], np.inf)
+        keep = x < after
+
+        first = x[keep][0]
+        while dq and dq[-1][1] >= first:
+            dq.pop()
+        dq.extend(zip(t[keep].tolist(), x[keep].tolist()))
+
+    # ---------- Reading ----------
+
+    def snapshot(self):
+        # Arrays (one entry per channel) of every statistic; nan where the
+        # window holds too few readings
+        n = self._n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.where(n > 1, np.sqrt(np.maximum(self._m2, 0.0) / (n - 1)), np.nan)
+
+            sx = self._mean * n
+            denom = n * self._stt - self._st ** 2
+            slope = np.where((n > 1) & (denom > 0), (n * self._stx - self._st * sx) / denom, np.nan)
+
+        return {
+            "count": n.astype(int),
+            "mean": np.where(n > 0, self._mean, np.nan),
+            "std": std,
+            "min": np.array([dq[0][1] if dq else np.nan for dq in self._mins]),
+            "max": np.array([-dq[0][1] if dq else np.nan for dq in self._maxs]),
+            "slope": slope,
+        }
+
+    def summary(self, names):
+        # {channel name: {statistic: value}} for the channels in `names` order
+        snap = self.snapshot()
+        return {
+            name: {key: (int if key == "count" else float)(snap[key][i]) for key in snap}
+            for i, name in enumerate(names)
+        }